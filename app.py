@@ -1,19 +1,17 @@
 import os,time
 import logging
 import sys
-from utils.llm import get_llm_client,llm_gen_dict
-from utils.nitter import nitter_list_rss
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
-from pytz import timezone
-from utils.notion import NotionMarkdownManager
-from pyairtable import Table
-from utils.discord import DiscordWebhook
 from dotenv import load_dotenv,find_dotenv
-from utils.seedream import generate_image
-from utils.set_env import set_env_from_airtable_data
 import random,traceback
-from utils.grok_client import call_grok_api
+import signal
+from functools import partial
+from utils.pipeline import Pipeline, Stage
+from utils.journal import RecordJournal
+from utils.metrics import metrics
+from utils.airtable_buffer import AirtableWriteBuffer
+from utils.lease import RecordLeaser, lease_enabled
+# openai / notion_client / pyairtable / feedparser / html2text / apscheduler 等较重的依赖
+# 在用到的函数内导入，import app 时不加载这些库，也不访问网络
 
 # 配置logging
 logging.basicConfig(
@@ -24,7 +22,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 load_dotenv(find_dotenv())
-set_env_from_airtable_data()
 
 def validate_notion_response(response, context=""):
     """验证 Notion API 响应"""
@@ -32,8 +29,244 @@ def validate_notion_response(response, context=""):
         raise ValueError(f"Notion API 返回空响应 {context}")
     return response
 
-def dailyMission(maxlimit=99):
+def preload_stage_modules():
+    """在主线程中导入各阶段用到的模块，避免多个 worker 线程首次导入时争抢导入锁"""
+    with metrics.timer('module_import'):
+        import utils.nitter, utils.grok_client, utils.llm, utils.seedream
+
+# 各阶段默认并发数：research 阶段占用浏览器 tab，其余阶段只调用外部 API
+DEFAULT_STAGE_CONCURRENCY = {
+    'research': 1,
+    'titles': 2,
+    'cover': 2,
+    'publish': 2,
+}
+
+def get_stage_concurrency(name):
+    """读取阶段并发数，环境变量 STAGE_CONCURRENCY_<NAME> 优先"""
+    return int(os.getenv(f'STAGE_CONCURRENCY_{name.upper()}', DEFAULT_STAGE_CONCURRENCY[name]))
+
+def new_record_context(idx, record, run_date, journal):
+    """创建单条记录在流水线中流转的上下文，并载入当天已完成阶段的检查点"""
+    return {
+        'idx': idx,
+        'id': record['id'],
+        'fields': record['fields'],
+        'run_date': run_date,
+        'checkpoint': journal.load(record['id'], run_date),
+        'prompt': None,
+        'grok_result': None,
+        'titles': None,
+        'chosen_url': None,
+        'page_id': None,
+    }
+
+def save_checkpoint(ctx, journal, stage, value):
+    """保存阶段产出到检查点，重启后可直接复用"""
+    journal.save(ctx['id'], ctx['run_date'], stage, value)
+    ctx['checkpoint'][stage] = value
+
+def stage_research(ctx, journal, leaser=None):
+    """阶段1：抓取推文并调用 Grok 深度搜索"""
+    from utils.nitter import nitter_list_rss
+    from utils.grok_client import call_grok_api, extract_artifact
+
+    idx, id, fields = ctx['idx'], ctx['id'], ctx['fields']
+    checkpoint = ctx['checkpoint']
+    status = fields.get('status', 'Ready')
+    logger.info(f"[处理记录][{idx}] 开始处理记录: id={id}, status={status}")
+
+    if checkpoint.get('done'):
+        logger.info(f"[处理记录][{idx}] 记录今天已处理完成，跳过")
+        return False
+    # 多节点部署时先认领记录，被其他节点认领的直接跳过
+    if leaser and not leaser.claim(id):
+        return False
+    if checkpoint.get('artifact'):
+        logger.info(f"[处理记录][{idx}] 从检查点恢复 Grok 结果，跳过深度搜索")
+        ctx['grok_result'] = checkpoint['artifact']
+        return
+
+    # 获取 todo_prompt
+    todo_prompt = checkpoint.get('prompt')
+    if todo_prompt is None:
+        with metrics.timer('rss_fetch'):
+            todo_prompt, feed_seen = nitter_list_rss(fields['nitter_rss'],15,return_seen=True)
+        if not todo_prompt:
+            logger.info(f"[处理记录][{idx}] 没有新的推文，跳过")
+            # 记为今天已处理，其他节点不会再认领
+            if leaser:
+                leaser.complete(id)
+            return False
+        todo_prompt += 'pick the hottest topic from these tweets by verified accounts and use embedding mode to search more recent topic-related hot posts and output a xaiArtifact report'
+        # 推文在记录发布完成后才记为已用，失败的记录之后还能用到这些推文
+        if feed_seen:
+            save_checkpoint(ctx, journal, 'feed_seen', feed_seen)
+        save_checkpoint(ctx, journal, 'prompt', todo_prompt)
+    ctx['prompt'] = todo_prompt
+
+    grok_result = None
+    if checkpoint.get('grok_raw'):
+        logger.info(f"[处理记录][{idx}] 从检查点恢复 Grok 原始响应")
+        try:
+            grok_result = extract_artifact(checkpoint['grok_raw'])
+        except Exception as e:
+            logger.warning(f"[处理记录][{idx}] 检查点中的 Grok 原始响应解析失败，重新提问: {str(e)}")
+    if not grok_result:
+        logger.info(f"[处理记录][{idx}] 调用 grok api")
+        grok_raw, grok_result = call_grok_api(todo_prompt,deepsearch=True,return_raw=True)
+        if grok_raw:
+            save_checkpoint(ctx, journal, 'grok_raw', grok_raw)
+    ctx['grok_result'] = validate_notion_response(
+        grok_result,
+        f"调用 Grok API 处理记录 {id} 的内容"
+    )
+    save_checkpoint(ctx, journal, 'artifact', grok_result)
+
+def stage_titles(ctx, journal):
+    """阶段2：根据 Grok 结果生成中英文标题"""
+    from utils.llm import get_llm_client,llm_gen_dict
+
+    idx, id = ctx['idx'], ctx['id']
+    if ctx['checkpoint'].get('titles'):
+        ctx['titles'] = ctx['checkpoint']['titles']
+        logger.info(f"[处理记录][{idx}] 从检查点恢复标题: {ctx['titles']}")
+        return
+    title_format = {
+        'title_en':'upper title in english with \n， change lines between time, description and the leading role，such as 2025\nTOP 5\nREASONING MODEL',
+        'title_cn':'中文标题带换行（年份\n描述\n主体，比如"2025\n排名前五\n推理模型"）'
+    }
+    title_prompt = '\n\nWrite a title for this youtube video in 2025.'
+    logger.info(f"[处理记录][{idx}] 生成标题")
+    with metrics.timer('llm_title'):
+        ctx['titles'] = validate_notion_response(
+            llm_gen_dict(get_llm_client(),'gpt-4o-mini',ctx['grok_result']+title_prompt,title_format),
+            f"生成记录 {id} 的标题"
+        )
+    logger.info(f"[处理记录][{idx}] 生成的标题: {ctx['titles']}")
+    save_checkpoint(ctx, journal, 'titles', ctx['titles'])
+
+def stage_cover(ctx, airtable_writes, journal):
+    """阶段3：选择现有封面或生成新的封面图片"""
+    from utils.seedream import generate_image
+
+    idx, id = ctx['idx'], ctx['id']
+    if 'cover' in ctx['checkpoint']:
+        ctx['chosen_url'] = ctx['checkpoint']['cover']
+        logger.info(f"[处理记录][{idx}] 从检查点恢复封面URL: {ctx['chosen_url']}")
+        return
+    existing_cover = ctx['fields'].get('cover_url')
+    logger.info(f"[处理记录][{idx}] 记录现有封面URL: {existing_cover}")
+
+    chosen_url = None
+    if existing_cover:
+        chosen_url = existing_cover
+        logger.info(f"[处理记录][{idx}] 使用现有封面URL: {chosen_url}  清空原记录封面")
+        airtable_writes.update(id, {
+            'status': 'Ready',
+            'cover_url': None
+        })
+    else:
+        logger.info(f"[处理记录][{idx}] 生成新的图片")
+        try:
+            with metrics.timer('image_gen'):
+                image_urls = generate_image(ctx['grok_result'])
+            if image_urls:
+                logger.info(f"[处理记录][{idx}] 获取到 {len(image_urls)} 个图片URL")
+                chosen_url = random.choice(image_urls)
+                logger.info(f"[处理记录][{idx}] 随机选择的新图片URL: {chosen_url}")
+                remaining_urls = [imgurl for imgurl in image_urls if imgurl != chosen_url]
+                if remaining_urls:
+                    airtable_writes.update(id, {
+                        'status': 'Ready',
+                        'cover_url': random.choice(remaining_urls)
+                    })
+            else:
+                logger.warning(f"[处理记录][{idx}] 图片生成失败，将不使用图片")
+        except Exception as e:
+            logger.error(f"[处理记录][{idx}] 图片生成过程出错: {str(e)}")
+    ctx['chosen_url'] = chosen_url
+    save_checkpoint(ctx, journal, 'cover', chosen_url)
+
+def stage_publish(ctx, airtable_writes, manager, journal, leaser=None):
+    """阶段4：写入 Notion 页面并回写 Airtable"""
+    idx, id = ctx['idx'], ctx['id']
+    checkpoint = ctx['checkpoint']
+    grok_result, titles, chosen_url = ctx['grok_result'], ctx['titles'], ctx['chosen_url']
+
+    new_page_id = checkpoint.get('page_id')
+    if new_page_id:
+        logger.info(f"[处理记录][{idx}] 从检查点恢复 Notion 页面: {new_page_id}")
+    else:
+        logger.info(f"[处理记录][{idx}] 创建新的 Markdown 内容")
+        md_content = grok_result
+        if chosen_url:
+            md_content = f'![thumbnail]({chosen_url})\n\n{grok_result}'
+
+        logger.info(f"[处理记录][{idx}] 插入新的 Notion 页面")
+        create_params = {
+            "md_text": md_content,
+            "title": titles['title_en'].replace('\n',' ').strip()
+        }
+        if chosen_url:
+            create_params["cover_url"] = chosen_url
+
+        new_page_id = validate_notion_response(
+            manager.insert_markdown_to_notion(**create_params),
+            f"创建记录 {id} 的新子页面"
+        )
+        save_checkpoint(ctx, journal, 'page_id', new_page_id)
+        logger.info(f"[处理记录][{idx}] 新页面创建成功: {new_page_id}")
+    ctx['page_id'] = new_page_id
+
+    if not checkpoint.get('page_properties'):
+        logger.info(f"[处理记录][{idx}] 更新新页面的属性")
+        with metrics.timer('notion_update'):
+            manager.notion.pages.update(
+                page_id=new_page_id,
+                properties={
+                    "intro_en": {
+                        "rich_text": [
+                            {"type": "text", "text": {"content": titles['title_en']}}
+                        ]
+                    },
+                    "intro_cn": {
+                        "rich_text": [
+                            {"type": "text", "text": {"content": titles['title_cn']}}
+                        ]
+                    }
+                }
+            )
+        save_checkpoint(ctx, journal, 'page_properties', True)
+
+    # 更新 Airtable 记录状态和封面 URL
+    update_fields = {}
+    if chosen_url:
+        update_fields['cover_url'] = chosen_url
+    if update_fields:
+        airtable_writes.update(id, update_fields)
+
+    if checkpoint.get('feed_seen'):
+        from utils.nitter import mark_entries_seen
+        mark_entries_seen(ctx['fields']['nitter_rss'], checkpoint['feed_seen'])
+    save_checkpoint(ctx, journal, 'done', True)
+    if leaser:
+        leaser.complete(id)
+    logger.info(f"[处理记录][{idx}] 记录处理完成")
+
+def dailyMission(maxlimit=99, concurrency=None):
+    """每日任务入口
+
+    Args:
+        maxlimit: 本次最多处理的记录数
+        concurrency: Grok 阶段同时处理的记录数，默认读取环境变量 DAILY_CONCURRENCY（未设置则为1）。
+            每条记录使用独立的 Grok tab；标题、封面、发布阶段的并发数由 STAGE_CONCURRENCY_<NAME> 控制
+    """
     logger.info(f"[定时任务] 开始执行dailyMission - {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    from utils.set_env import set_env_from_airtable_data, get_airtable_table
+    from utils.notion import NotionMarkdownManager
+    from utils.discord import DiscordWebhook
+    metrics.reset()
 
     try:
         # 初始化环境变量
@@ -42,139 +275,85 @@ def dailyMission(maxlimit=99):
         discord = DiscordWebhook()
 
         logger.info("[Airtable] 初始化 Table")
-        airtable = Table(
-            os.environ['AIRTABLE_KEY'],
-            os.environ['AIRTABLE_BASE_ID'],
-            'prompt'
-        )
+        airtable = get_airtable_table('prompt')
 
         logger.info("[Notion] 初始化 NotionMarkdownManager")
         manager = NotionMarkdownManager(os.environ['NOTION_API_KEY'], os.environ['NOTION_DATABASE_ID'])
 
+        run_date = time.strftime('%Y-%m-%d')
         airtable_records = airtable.all(formula="{status} = 'Ready'")
         logger.info(f"[Airtable] 找到 {len(airtable_records)} 个prompts")
+        leaser = None
+        if lease_enabled():
+            leaser = RecordLeaser(airtable, run_date)
+            airtable_records = [r for r in airtable_records if leaser.is_claimable(r['fields'])]
+            logger.info(f"[Lease] 可认领的prompts: {len(airtable_records)}")
+        airtable_records = airtable_records[:min(maxlimit,len(airtable_records))]
+
+        preload_stage_modules()
+        journal = RecordJournal()
+        # 同一记录的多次字段更新合并后批量写入，任务结束时统一 flush
+        airtable_writes = AirtableWriteBuffer(airtable)
+
+        if concurrency is None:
+            concurrency = int(os.getenv('DAILY_CONCURRENCY', get_stage_concurrency('research')))
+        stages = [
+            Stage('research', partial(stage_research, journal=journal, leaser=leaser), concurrency),
+            Stage('titles', partial(stage_titles, journal=journal), get_stage_concurrency('titles')),
+            Stage('cover', partial(stage_cover, airtable_writes=airtable_writes, journal=journal), get_stage_concurrency('cover')),
+            Stage('publish', partial(stage_publish, airtable_writes=airtable_writes, manager=manager, journal=journal, leaser=leaser), get_stage_concurrency('publish')),
+        ]
 
         success_count = 0
         error_count = 0
         error_messages = []
 
-        for idx, record in enumerate(airtable_records):
-            if idx >= min(maxlimit,len(airtable_records)):
-                break
-            try:
-                id = record['id']
-                fields = record['fields']
-                status = fields.get('status', 'Ready')
-                logger.info(f"[处理记录][{idx}] 开始处理记录: id={id}, status={status}")
-
-                # 获取 todo_prompt
-                todo_prompt = nitter_list_rss(record['fields']['nitter_rss'],15)
-                todo_prompt += 'pick the hottest topic from these tweets by verified accounts and use embedding mode to search more recent topic-related hot posts and output a xaiArtifact report'
-                if todo_prompt is None:
-                    logger.info(f"[处理记录][{idx}] 跳过空内容记录")
-                    continue
-
-                # 获取现有封面 URL
-                existing_cover = fields.get('cover_url')
-                logger.info(f"[处理记录][{idx}] 记录现有封面URL: {existing_cover}")
-
-                logger.info(f"[处理记录][{idx}] 调用 grok api")
-                grok_result = validate_notion_response(
-                    call_grok_api(todo_prompt,deepsearch=True),
-                    f"调用 Grok API 处理记录 {id} 的内容"
-                )
-                title_format = {
-                    'title_en':'upper title in english with \n， change lines between time, description and the leading role，such as 2025\nTOP 5\nREASONING MODEL',
-                    'title_cn':'中文标题带换行（年份\n描述\n主体，比如"2025\n排名前五\n推理模型"）'
-                }
-                title_prompt = '\n\nWrite a title for this youtube video in 2025.'
-                logger.info(f"[处理记录][{idx}] 生成标题")
-                titles = validate_notion_response(
-                    llm_gen_dict(get_llm_client(),'gpt-4o-mini',grok_result+title_prompt,title_format),
-                    f"生成记录 {id} 的标题"
-                )
-                logger.info(f"[处理记录][{idx}] 生成的标题: {titles}")
-
-                # 处理封面图片
-                chosen_url = None
-                if existing_cover:
-                    chosen_url = existing_cover
-                    logger.info(f"[处理记录][{idx}] 使用现有封面URL: {chosen_url}  清空原记录封面")
-                    airtable.update(id, {
-                        'status': 'Ready',
-                        'cover_url': None
-                    })
-                else:
-                    logger.info(f"[处理记录][{idx}] 生成新的图片")
-                    try:
-                        image_urls = generate_image(grok_result)
-                        if image_urls:
-                            logger.info(f"[处理记录][{idx}] 获取到 {len(image_urls)} 个图片URL")
-                            chosen_url = random.choice(image_urls)
-                            logger.info(f"[处理记录][{idx}] 随机选择的新图片URL: {chosen_url}")
-                            remaining_urls = [imgurl for imgurl in image_urls if imgurl != chosen_url]
-                            if remaining_urls:
-                                airtable.update(id, {
-                                    'status': 'Ready',
-                                    'cover_url': random.choice(remaining_urls)
-                                })
-                        else:
-                            logger.warning(f"[处理记录][{idx}] 图片生成失败，将不使用图片")
-                    except Exception as e:
-                        logger.error(f"[处理记录][{idx}] 图片生成过程出错: {str(e)}")
-
-                logger.info(f"[处理记录][{idx}] 创建新的 Markdown 内容")
-                md_content = grok_result
-                if chosen_url:
-                    md_content = f'![thumbnail]({chosen_url})\n\n{grok_result}'
-
-                logger.info(f"[处理记录][{idx}] 插入新的 Notion 页面")
-                create_params = {
-                    "md_text": md_content,
-                    "title": titles['title_en'].replace('\n',' ').strip()
-                }
-                if chosen_url:
-                    create_params["cover_url"] = chosen_url
-
-                new_page_id = validate_notion_response(
-                    manager.insert_markdown_to_notion(**create_params),
-                    f"创建记录 {id} 的新子页面"
-                )
-                logger.info(f"[处理记录][{idx}] 新页面创建成功: {new_page_id}")
-
-                logger.info(f"[处理记录][{idx}] 更新新页面的属性")
-                manager.notion.pages.update(
-                    page_id=new_page_id,
-                    properties={
-                        "intro_en": {
-                            "rich_text": [
-                                {"type": "text", "text": {"content": titles['title_en']}}
-                            ]
-                        },
-                        "intro_cn": {
-                            "rich_text": [
-                                {"type": "text", "text": {"content": titles['title_cn']}}
-                            ]
-                        }
-                    }
-                )
-
-                # 更新 Airtable 记录状态和封面 URL
-                update_fields = {}
-                if chosen_url:
-                    update_fields['cover_url'] = chosen_url
-                if update_fields:
-                    airtable.update(id, update_fields)
-
+        if airtable_records:
+            from utils.browser_manager import browser_manager_enabled, get_browser_manager
+            if browser_manager_enabled():
+                # 启动已退出的浏览器，重启内存过大的浏览器（此时没有进行中的提问）
+                get_browser_manager().ensure_running()
+            # RSS 抓取期间在后台打开并加载 Grok tab；tab 池上限至少为研究阶段的并发数
+            from utils.grok_client import warm_tab_pool
+            warm_tab_pool(min(concurrency, len(airtable_records)), concurrency)
+            # 所有记录的 RSS 在后台并发抓取，研究阶段直接使用结果
+            from utils.rss_fetch import prefetch_feeds
+            prefetch_feeds([r['fields']['nitter_rss'] for r in airtable_records if r['fields'].get('nitter_rss')])
+        jobs = Pipeline(stages).run(
+            new_record_context(idx, record, run_date, journal) for idx, record in enumerate(airtable_records)
+        )
+        journal.close()
+        if airtable_records:
+            from utils.grok_client import close_tab_pool
+            close_tab_pool()
+            from utils.rss_fetch import close_feed_fetcher
+            close_feed_fetcher()
+            from utils.nitter_threads import close_thread_expander
+            close_thread_expander()
+        # 按记录顺序汇总结果，保证错误信息的顺序与记录顺序一致
+        for job in jobs:
+            metrics.incr(f'records_{job.status}')
+            if job.status == 'done':
                 success_count += 1
-                logger.info(f"[处理记录][{idx}] 记录处理完成")
-
-            except Exception as e:
-                error_message = f"处理第{idx+1}个记录时出错: {str(e)}\n{traceback.format_exc()}"
-                logger.error(f"[处理记录][{idx}] {error_message}")
+            elif job.status == 'failed':
+                if leaser:
+                    leaser.release(job.item['id'])
+                e = job.error
+                error_message = f"处理第{job.idx+1}个记录时出错: [{job.failed_stage}] {str(e)}\n{''.join(traceback.format_exception(e))}"
+                logger.error(f"[处理记录][{job.idx}] {error_message}")
                 error_count += 1
                 error_messages.append(error_message)
 
+        if leaser:
+            leaser.close()
+        try:
+            airtable_writes.close()
+        except Exception as e:
+            error_message = f"写入 Airtable 缓存更新时出错: {str(e)}"
+            logger.error(f"[Airtable] {error_message}")
+            error_count += 1
+            error_messages.append(error_message)
+
         if success_count > 0:
             success_msg = f"成功处理了 {success_count} 个记录"
             logger.info(f"[任务完成] {success_msg}")
@@ -186,16 +365,32 @@ def dailyMission(maxlimit=99):
             logger.error(f"[任务错误] {error_msg}")
             discord.send_error(error_msg, title="处理过程有错误")
 
+        metrics.export()
         logger.info(f"[定时任务] dailyMission执行结束")
     except Exception as e:
         error_msg = f"执行dailyMission出错: {str(e)}\n{traceback.format_exc()}"
         logger.error(f"[定时任务] {error_msg}")
+        metrics.export()
         discord.send_error(error_msg)
         sys.exit(1)
 
 if __name__ == "__main__":
+    if '--startup-report' in sys.argv:
+        from utils.startup import import_time_report
+        print(import_time_report('app'))
+        sys.exit(0)
+
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from pytz import timezone
+    from utils.set_env import set_env_from_airtable_data
+    from utils.discord import DiscordWebhook
+
+    # docker stop 发送 SIGTERM，转为 SystemExit 以便 atexit 写入缓存中的 Airtable 更新
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     scheduler = BlockingScheduler(timezone=timezone('UTC'))
     try:
+        set_env_from_airtable_data()
         # 将东八区的时间转换为UTC时间
         local_hour, local_minute = map(int, os.environ['DAILY_TIME'].split(':'))
         utc_hour = (local_hour - 8) % 24  # 东八区减8小时
@@ -0,0 +1,128 @@
+"""
+dailyMission 离线端到端压测
+
+所有外部服务（Grok/CDP、OpenRouter、Notion、Airtable、Dreamina、Discord、nitter RSS）
+都由 bench.fake_services 中的本地假服务替代，延迟与错误率可配置，结果可复现。
+
+用法:
+    python -m bench.e2e --records 20 --concurrency 4 --latency grok=3 --error-rate openai=0.05
+"""
+
+import os
+import sys
+import time
+import json
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+from bench.fake_services import FakeServices, DEFAULT_LATENCY
+
+def parse_kv(items):
+    """解析 name=value 形式的参数列表"""
+    result = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        if name not in DEFAULT_LATENCY:
+            raise argparse.ArgumentTypeError(f'未知服务: {name}，可选: {", ".join(DEFAULT_LATENCY)}')
+        result[name] = float(value)
+    return result
+
+def format_report(args, elapsed, summary, success, peak_traced, peak_rss):
+    lines = [
+        f"records={args.records} concurrency={args.concurrency} elapsed={elapsed:.2f}s",
+        f"success={success} records/hour={success / elapsed * 3600 if elapsed else 0:.1f}",
+        f"peak traced memory={peak_traced / 1024 / 1024:.1f} MiB, peak RSS={peak_rss / 1024:.1f} MiB",
+        '',
+        f"{'stage':<28}{'count':>7}{'fail':>6}{'p50(s)':>10}{'p95(s)':>10}{'sum(s)':>10}",
+    ]
+    for stage, s in sorted(summary['stages'].items()):
+        lines.append(f"{stage:<28}{s['count']:>7}{s['failures']:>6}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['sum']:>10.2f}")
+    if summary['counters']:
+        lines.append('')
+        lines.append('counters: ' + ', '.join(f'{k}={v}' for k, v in sorted(summary['counters'].items())))
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='dailyMission 离线端到端压测')
+    parser.add_argument('--records', type=int, default=10, help='Ready 记录数')
+    parser.add_argument('--concurrency', type=int, default=1, help='Grok 阶段并发数（dailyMission 的 concurrency 参数）')
+    parser.add_argument('--latency', nargs='*', default=[], metavar='SERVICE=SECONDS',
+                        help=f'服务平均延迟，默认 {DEFAULT_LATENCY}')
+    parser.add_argument('--error-rate', nargs='*', default=[], metavar='SERVICE=RATE', help='服务错误率 0~1')
+    parser.add_argument('--jitter', type=float, default=0.2, help='延迟抖动比例')
+    parser.add_argument('--noise-events', type=int, default=200, help='每次页面加载推送的无关 CDP 事件数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-lean-tab', action='store_true', help='不拦截 Grok 页面的图片/字体等资源（GROK_LEAN_TAB=0）')
+    parser.add_argument('--no-grok-cache', action='store_true', help='关闭 Grok 回答缓存（GROK_CACHE_TTL=0）')
+    parser.add_argument('--expand-threads', action='store_true', help='展开 RSS 条目所在的 thread（RSS_EXPAND_THREADS=1）')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    parser.add_argument('--verbose', action='store_true', help='保留应用的 DEBUG 日志')
+    args = parser.parse_args(argv)
+
+    fakes = FakeServices(
+        records=args.records,
+        latency=parse_kv(args.latency),
+        error_rate=parse_kv(args.error_rate),
+        jitter=args.jitter,
+        noise_events=args.noise_events,
+        seed=args.seed,
+    )
+    fakes.start()
+
+    workdir = tempfile.mkdtemp(prefix='deepsearch-bench-')
+    os.environ.update(fakes.env())
+    os.environ['JOURNAL_PATH'] = os.path.join(workdir, 'journal.sqlite3')
+    os.environ['METRICS_PATH'] = os.path.join(workdir, 'metrics.jsonl')
+    os.environ['CONFIG_SNAPSHOT_PATH'] = os.path.join(workdir, 'config_snapshot.json')
+    os.environ['GROK_CACHE_PATH'] = os.path.join(workdir, 'grok_cache.sqlite3')
+    os.environ['RSS_CACHE_PATH'] = os.path.join(workdir, 'rss_cache.sqlite3')
+    os.environ['FEED_STATE_PATH'] = os.path.join(workdir, 'feed_state.sqlite3')
+    os.environ['THREAD_CACHE_PATH'] = os.path.join(workdir, 'thread_cache.sqlite3')
+    if args.expand_threads:
+        os.environ['RSS_EXPAND_THREADS'] = '1'
+    if args.no_lean_tab:
+        os.environ['GROK_LEAN_TAB'] = '0'
+    if args.no_grok_cache:
+        os.environ['GROK_CACHE_TTL'] = '0'
+
+    tracemalloc.start()
+    import app
+    from utils.metrics import metrics
+    if not args.verbose:
+        # llm_gen_dict 每次调用都会把自己的 logger 设为 DEBUG，只能全局屏蔽
+        logging.disable(logging.INFO)
+
+    start = time.perf_counter()
+    try:
+        app.dailyMission(maxlimit=args.records, concurrency=args.concurrency)
+    except SystemExit:
+        print('dailyMission 异常退出，见上方日志', file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    summary = metrics.summary()
+    success = int(summary['counters'].get('records_done', 0))
+    fakes.stop()
+
+    if args.json:
+        print(json.dumps({
+            'records': args.records,
+            'concurrency': args.concurrency,
+            'elapsed': round(elapsed, 3),
+            'records_per_hour': round(success / elapsed * 3600, 1) if elapsed else 0,
+            'peak_traced_bytes': peak_traced,
+            'peak_rss_kib': peak_rss,
+            'stages': summary['stages'],
+            'counters': summary['counters'],
+            'requests': fakes.request_counts,
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(args, elapsed, summary, success, peak_traced, peak_rss))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""
+本地假服务：用于离线压测 dailyMission
+
+一个 aiohttp 服务按路径前缀模拟所有外部依赖：
+    /cdp       Chrome DevTools（HTTP /json/* + 每个 tab 的 websocket），模拟 grok.com 页面
+    /openai    OpenAI 兼容的 /chat/completions
+    /notion    Notion API（/v1/pages、/v1/blocks/{id}/children）
+    /airtable  Airtable API（/v0/{base}/{table}）
+    /dreamina  图片生成
+    /discord   Discord webhook
+    /rss       nitter list RSS
+    /nitter    nitter 推文页（thread 展开）
+每个服务的延迟和错误率都可以单独配置。
+"""
+
+import json
+import uuid
+import base64
+import fnmatch
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY = {
+    'cdp_navigate': 0.2,
+    'grok': 2.0,
+    'grok_quick': 0.5,
+    'openai': 0.3,
+    'notion': 0.1,
+    'airtable': 0.05,
+    'dreamina': 1.0,
+    'discord': 0.05,
+    'rss': 0.05,
+    'nitter': 0.2,
+}
+
+# 页面加载的子资源：脚本和样式之外的图片、字体、统计脚本、媒体可以被 setBlockedURLs 拦截
+PAGE_RESOURCES = [
+    'https://grok.com/_next/static/chunks/app-{i}.js',
+    'https://grok.com/_next/static/css/{i}.css',
+    'https://grok.com/images/{i}.webp',
+    'https://grok.com/images/avatar-{i}.png',
+    'https://grok.com/fonts/{i}.woff2',
+    'https://www.googletagmanager.com/gtm.js?id={i}',
+    'https://grok.com/media/{i}.mp4',
+]
+
+# grok 回答分成多少块到达，每块耗时 grok 延迟的 1/GROK_BODY_CHUNKS
+GROK_BODY_CHUNKS = 10
+
+def conversation_page(author: str, status_id: int, thread_len: int, replies: int, text_size: int = 200) -> str:
+    """nitter 推文页：原作者连续 thread_len 条推文（从 status_id 开始），之后是其他用户的 replies 条回复"""
+    text = ('lorem ipsum dolor sit amet ' * (text_size // 27 + 1))[:text_size]
+    items = []
+    for i in range(thread_len + replies):
+        user = author if i < thread_len else f'reply{i % 17}'
+        items.append(
+            f'<div class="timeline-item"><a class="tweet-link" href="/{user}/status/{status_id + i}#m"></a>'
+            f'<div class="tweet-body"><div class="tweet-header"><a class="username" href="/{user}" title="@{user}">@{user}</a>'
+            f'</div><div class="tweet-content media-body" dir="auto">{text} {i}</div></div></div>'
+        )
+    return ('<!DOCTYPE html><html><head><title>nitter</title></head><body><div class="conversation">'
+            + ''.join(items) + '</div></body></html>')
+
+FAKE_REPORT = '''# FAKE
+## TOP 5
+### BENCHMARK TOPIC
+
+Some **bold** intro with a [link](https://example.com).
+
+- point one
+- point two
+
+| col a | col b |
+| --- | --- |
+| 1 | 2 |
+'''
+
+class FakeServices:
+    """在后台线程中运行的假服务集合
+
+    Args:
+        records: Airtable prompt 表中 status=Ready 的记录数
+        latency: 各服务的平均延迟（秒），未指定的使用 DEFAULT_LATENCY
+        error_rate: 各服务的错误率（0~1），未指定的为 0
+        jitter: 延迟抖动比例，实际延迟在 latency*(1±jitter) 之间均匀分布
+        noise_events: 页面加载时额外推送的无关 Network 事件数，模拟真实页面的 CDP 流量
+        seed: 随机种子，保证结果可复现
+    """
+    def __init__(self, records: int = 10, latency: Optional[Dict[str, float]] = None,
+                 error_rate: Optional[Dict[str, float]] = None, jitter: float = 0.2,
+                 noise_events: int = 200, rss_entries: int = 20, seed: int = 42):
+        self.records = records
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.error_rate = error_rate or {}
+        self.jitter = jitter
+        self.noise_events = noise_events
+        self.rss_entries = rss_entries
+        self.random = random.Random(seed)
+        self.base_url = None
+        self.request_counts: Dict[str, int] = {}
+        self._tables: Dict[str, Dict[str, dict]] = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> str:
+        """启动服务并返回 base_url"""
+        self._thread = threading.Thread(target=self._run, name='fake-services', daemon=True)
+        self._thread.start()
+        self._started.wait()
+        logger.info(f"[FakeServices] 已启动: {self.base_url}")
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def env(self) -> Dict[str, str]:
+        """把应用指向假服务所需的环境变量"""
+        return {
+            'AIRTABLE_KEY': 'fake-airtable-key',
+            'AIRTABLE_BASE_ID': 'appFAKEBASE',
+            'AIRTABLE_ENDPOINT_URL': f'{self.base_url}/airtable',
+            'CDP_ENDPOINT': f'{self.base_url}/cdp',
+            'NOTION_BASE_URL': f'{self.base_url}/notion',
+            'NITTER_URL': f'{self.base_url}/nitter',
+        }
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.add_routes([
+            web.get('/cdp/json', self.cdp_list),
+            web.get('/cdp/json/list', self.cdp_list),
+            web.get('/cdp/json/version', self.cdp_version),
+            web.put('/cdp/json/new', self.cdp_new),
+            web.get('/cdp/json/close/{page_id}', self.cdp_close),
+            web.get('/cdp/devtools/page/{page_id}', self.cdp_ws),
+            web.post('/openai/chat/completions', self.openai_chat),
+            web.post('/notion/v1/pages', self.notion_create_page),
+            web.patch('/notion/v1/pages/{page_id}', self.notion_update_page),
+            web.patch('/notion/v1/blocks/{block_id}/children', self.notion_append),
+            web.get('/airtable/v0/{base}/{table}', self.airtable_list),
+            web.patch('/airtable/v0/{base}/{table}', self.airtable_batch_update),
+            web.get('/airtable/v0/{base}/{table}/{record_id}', self.airtable_get),
+            web.patch('/airtable/v0/{base}/{table}/{record_id}', self.airtable_update),
+            web.post('/dreamina', self.dreamina),
+            web.post('/discord', self.discord),
+            web.get('/rss/{list_id}', self.rss),
+            web.get('/nitter/{user}/status/{status_id}', self.nitter_status),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}'
+        self._started.set()
+        self._loop.run_forever()
+
+    # ---------- 工具方法 ----------
+
+    async def _delay(self, service: str):
+        self.request_counts[service] = self.request_counts.get(service, 0) + 1
+        await self._sleep(service)
+
+    async def _sleep(self, service: str, scale: float = 1.0):
+        base = self.latency.get(service, 0) * scale
+        if base > 0:
+            await asyncio.sleep(base * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _should_fail(self, service: str) -> bool:
+        return self.random.random() < self.error_rate.get(service, 0)
+
+    async def _handle(self, service: str):
+        """统一处理延迟与错误注入，需要报错时返回 500 响应"""
+        await self._delay(service)
+        if self._should_fail(service):
+            return web.json_response({'error': f'fake {service} failure'}, status=500)
+        return None
+
+    # ---------- Chrome DevTools ----------
+
+    async def cdp_list(self, request):
+        return web.json_response([])
+
+    async def cdp_version(self, request):
+        return web.json_response({'Browser': 'FakeChrome/1.0', 'Protocol-Version': '1.3'})
+
+    async def cdp_new(self, request):
+        page_id = uuid.uuid4().hex.upper()
+        ws_url = f"{self.base_url.replace('http://', 'ws://')}/cdp/devtools/page/{page_id}"
+        return web.json_response({'id': page_id, 'type': 'page', 'webSocketDebuggerUrl': ws_url})
+
+    async def cdp_close(self, request):
+        return web.Response(text='Target is closing')
+
+    async def cdp_ws(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        tab = {'deepsearch': False, 'network': False, 'tasks': set(),
+               'bodies': {}, 'received': {}, 'streaming': set(), 'blocked': [], 'conversation': None}
+
+        async def send(data):
+            if not ws.closed:
+                await ws.send_str(json.dumps(data))
+
+        def page_resources():
+            # 页面加载的子资源，约每个资源 3 个 Network 事件；命中 setBlockedURLs 的资源被拦截
+            urls = [PAGE_RESOURCES[i % len(PAGE_RESOURCES)].format(i=i) for i in range(self.noise_events // 3)]
+            blocked = [any(fnmatch.fnmatchcase(url, pattern) for pattern in tab['blocked']) for url in urls]
+            return urls, blocked
+
+        async def emit_noise(urls, blocked):
+            # 模拟页面加载时大量无关的网络事件
+            for i, (url, is_blocked) in enumerate(zip(urls, blocked)):
+                request_id = f'noise.{i}'
+                await send({'method': 'Network.requestWillBeSent',
+                            'params': {'requestId': request_id, 'request': {'url': url, 'method': 'GET'}}})
+                if is_blocked:
+                    await send({'method': 'Network.loadingFailed',
+                                'params': {'requestId': request_id, 'errorText': 'net::ERR_BLOCKED_BY_CLIENT',
+                                           'blockedReason': 'inspector'}})
+                    continue
+                await send({'method': 'Network.dataReceived',
+                            'params': {'requestId': request_id, 'dataLength': 1024, 'encodedDataLength': 512}})
+                await send({'method': 'Network.loadingFinished', 'params': {'requestId': request_id}})
+
+        async def answer(request_id):
+            # 响应体分块到达；调用过 Network.streamResourceContent 的请求在 dataReceived 中携带数据
+            # 开启 DeepSearch 时按 grok 延迟，否则按 grok_quick 延迟
+            # 页面上已有对话时是追问：发往该对话的 responses 接口，响应中不再有 conversation 行
+            service = 'grok' if tab['deepsearch'] else 'grok_quick'
+            self.request_counts[service] = self.request_counts.get(service, 0) + 1
+            conversation = tab['conversation']
+            if conversation is None:
+                tab['conversation'] = uuid.uuid4().hex
+                url = 'https://grok.com/rest/app-chat/conversations/new'
+            else:
+                self.request_counts['grok_follow_up'] = self.request_counts.get('grok_follow_up', 0) + 1
+                url = f'https://grok.com/rest/app-chat/conversations/{conversation}/responses'
+            body = self._grok_body(None if conversation else tab['conversation']).encode()
+            tab['bodies'][request_id] = body
+            tab['received'][request_id] = 0
+            await send({'method': 'Network.requestWillBeSent',
+                        'params': {'requestId': request_id, 'request': {'url': url, 'method': 'POST'}}})
+            await send({'method': 'Network.responseReceived',
+                        'params': {'requestId': request_id, 'response': {'status': 200}}})
+            chunk_size = max(1, len(body) // GROK_BODY_CHUNKS + 1)
+            for offset in range(0, len(body), chunk_size):
+                await self._sleep(service, 1 / GROK_BODY_CHUNKS)
+                chunk = body[offset:offset + chunk_size]
+                tab['received'][request_id] = offset + len(chunk)
+                params = {'requestId': request_id, 'dataLength': len(chunk), 'encodedDataLength': len(chunk)}
+                if request_id in tab['streaming']:
+                    params['data'] = base64.b64encode(chunk).decode()
+                await send({'method': 'Network.dataReceived', 'params': params})
+            await send({'method': 'Network.loadingFinished', 'params': {'requestId': request_id}})
+
+        async def navigate():
+            tab['conversation'] = None
+            urls, blocked = page_resources()
+            # 被拦截的资源不再占用加载时间
+            self.request_counts['cdp_navigate'] = self.request_counts.get('cdp_navigate', 0) + 1
+            loaded = 1 - sum(blocked) / len(urls) if urls else 1
+            await self._sleep('cdp_navigate', 0.3 + 0.7 * loaded)
+            if tab['network']:
+                await emit_noise(urls, blocked)
+            await send({'method': 'Page.loadEventFired', 'params': {'timestamp': 0}})
+
+        def spawn(coro):
+            task = asyncio.ensure_future(coro)
+            tab['tasks'].add(task)
+            task.add_done_callback(tab['tasks'].discard)
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(msg.data)
+            msg_id, method = data.get('id'), data.get('method')
+            params = data.get('params') or {}
+            result = {}
+
+            if method == 'Network.enable':
+                tab['network'] = True
+            elif method == 'Page.navigate':
+                spawn(navigate())
+                result = {'frameId': 'FAKEFRAME'}
+            elif method == 'Runtime.evaluate':
+                value = self._evaluate(tab, params.get('expression', ''))
+                if value == 'clicked-submit':
+                    value = 'clicked'
+                    spawn(answer(f'req.{uuid.uuid4().hex[:8]}'))
+                result = {'result': {'type': 'object' if isinstance(value, dict) else 'string', 'value': value}}
+            elif method == 'Network.setBlockedURLs':
+                tab['blocked'] = params.get('urls') or params.get('urlPatterns') or []
+            elif method == 'Performance.getMetrics':
+                result = {'metrics': [{'name': 'JSHeapUsedSize', 'value': 48 * 1024 * 1024}]}
+            elif method == 'Network.streamResourceContent':
+                request_id = params.get('requestId')
+                tab['streaming'].add(request_id)
+                buffered = tab['bodies'].get(request_id, b'')[:tab['received'].get(request_id, 0)]
+                result = {'bufferedData': base64.b64encode(buffered).decode()}
+            elif method == 'Network.getResponseBody':
+                result = {'body': tab['bodies'].pop(params.get('requestId'), b'').decode(), 'base64Encoded': False}
+            await send({'id': msg_id, 'result': result})
+
+        for task in list(tab['tasks']):
+            task.cancel()
+        return ws
+
+    def _evaluate(self, tab, expression: str):
+        """按脚本特征模拟 grok.com 页面上的 DOM 操作"""
+        if 'MutationObserver' in expression:
+            # wait_for_element：元素总是已经存在
+            return {'found': True, 'ariaPressed': 'true' if tab['deepsearch'] else 'false'}
+        if 'DeepSearch' in expression:
+            if 'click()' in expression:
+                tab['deepsearch'] = not tab['deepsearch']
+                return 'clicked'
+            return json.dumps({'found': True, 'ariaPressed': 'true' if tab['deepsearch'] else 'false'})
+        if 'submit' in expression and 'click()' in expression:
+            return 'clicked-submit'
+        if expression == 'document.readyState':
+            return 'complete'
+        if 'textarea' in expression:
+            return 'ok' if 'dispatchEvent' in expression else 'found'
+        return True
+
+    def _grok_body(self, conversation_id: Optional[str] = None) -> str:
+        if self._should_fail('grok'):
+            return json.dumps({'error': {'code': 8, 'message': 'fake grok failure'}})
+        lines = []
+        if conversation_id:
+            lines.append(json.dumps({'result': {'conversation': {'conversationId': conversation_id}}}))
+        for token in ['Thinking', ' about', ' it']:
+            lines.append(json.dumps({'result': {'response': {'token': token, 'isThinking': True}}}))
+        message = f'Intro text\n<xaiArtifact title="report" contentType="text/markdown">\n{FAKE_REPORT}\n</xaiArtifact>\nOutro'
+        for i in range(0, len(message), 40):
+            lines.append(json.dumps({'result': {'response': {'token': message[i:i + 40], 'isThinking': False}}}))
+        lines.append(json.dumps({'result': {'response': {'modelResponse': {'message': message}}}}))
+        return '\n'.join(lines)
+
+    # ---------- OpenAI ----------
+
+    async def openai_chat(self, request):
+        body = await request.json()
+        failed = await self._handle('openai')
+        if failed:
+            return failed
+        content = str({
+            'title_en': '2025\nFAKE\nBENCHMARK',
+            'title_cn': '2025\n压测\n标题',
+            'description': 'two engineers reading a report in a bright office',
+        })
+        return web.json_response({
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        })
+
+    # ---------- Notion ----------
+
+    async def notion_create_page(self, request):
+        await request.read()
+        failed = await self._handle('notion')
+        if failed:
+            return failed
+        return web.json_response({'object': 'page', 'id': str(uuid.uuid4()), 'properties': {}})
+
+    async def notion_update_page(self, request):
+        await request.read()
+        failed = await self._handle('notion')
+        if failed:
+            return failed
+        return web.json_response({'object': 'page', 'id': request.match_info['page_id'], 'properties': {}})
+
+    async def notion_append(self, request):
+        await request.read()
+        failed = await self._handle('notion')
+        if failed:
+            return failed
+        return web.json_response({'object': 'list', 'results': [], 'has_more': False, 'next_cursor': None})
+
+    # ---------- Airtable ----------
+
+    def _table(self, table: str) -> Dict[str, dict]:
+        # 有状态的表：更新会保留下来，多节点认领等逻辑可以读到彼此的写入
+        if table not in self._tables:
+            self._tables[table] = {r['id']: r for r in self._airtable_records(table)}
+        return self._tables[table]
+
+    def _update_fields(self, table: str, record_id: str, fields: dict) -> dict:
+        record = self._table(table).setdefault(
+            record_id, {'id': record_id, 'createdTime': '2025-01-01T00:00:00.000Z', 'fields': {}})
+        for name, value in fields.items():
+            if value is None:
+                record['fields'].pop(name, None)
+            else:
+                record['fields'][name] = value
+        return record
+
+    def _airtable_records(self, table: str):
+        if table == 'APIKeys':
+            rows = [
+                {'Name': 'notion', 'key': 'fake-notion-key', 'db_id': 'fake-db', 'category': 'deepsearch'},
+                {'Name': 'openrouter', 'key': 'fake-openai-key', 'endpoint': f'{self.base_url}/openai', 'category': 'deepsearch'},
+                {'Name': 'time', 'key': '08:00', 'category': 'deepsearch'},
+                {'Name': 'discord', 'endpoint': f'{self.base_url}/discord', 'category': 'deepsearch'},
+                {'Name': 'dreamina', 'key': 'fake-dreamina-key', 'endpoint': f'{self.base_url}/dreamina', 'category': 'deepsearch'},
+            ]
+        else:
+            rows = [
+                {'status': 'Ready', 'nitter_rss': f'{self.base_url}/rss/{i % 3}'}
+                for i in range(self.records)
+            ]
+        return [
+            {'id': f'rec{table[:3]}{i:06d}', 'createdTime': '2025-01-01T00:00:00.000Z', 'fields': fields}
+            for i, fields in enumerate(rows)
+        ]
+
+    async def airtable_list(self, request):
+        failed = await self._handle('airtable')
+        if failed:
+            return failed
+        return web.json_response({'records': list(self._table(request.match_info['table']).values())})
+
+    async def airtable_get(self, request):
+        failed = await self._handle('airtable')
+        if failed:
+            return failed
+        record = self._table(request.match_info['table']).get(request.match_info['record_id'])
+        if record is None:
+            return web.json_response({'error': 'NOT_FOUND'}, status=404)
+        return web.json_response(record)
+
+    async def airtable_update(self, request):
+        body = await request.json()
+        failed = await self._handle('airtable')
+        if failed:
+            return failed
+        return web.json_response(self._update_fields(
+            request.match_info['table'], request.match_info['record_id'], body.get('fields', {})))
+
+    async def airtable_batch_update(self, request):
+        body = await request.json()
+        failed = await self._handle('airtable')
+        if failed:
+            return failed
+        table = request.match_info['table']
+        return web.json_response({'records': [
+            self._update_fields(table, r['id'], r.get('fields', {})) for r in body.get('records', [])
+        ]})
+
+    # ---------- Dreamina / Discord / RSS ----------
+
+    async def dreamina(self, request):
+        await request.read()
+        failed = await self._handle('dreamina')
+        if failed:
+            return failed
+        return web.json_response({'data': [{'url': f'{self.base_url}/img/{uuid.uuid4().hex}.png'} for _ in range(4)]})
+
+    async def discord(self, request):
+        await request.read()
+        failed = await self._handle('discord')
+        if failed:
+            return failed
+        return web.Response(status=204)
+
+    async def rss(self, request):
+        failed = await self._handle('rss')
+        if failed:
+            return failed
+        list_id = request.match_info['list_id']
+        # 内容只取决于 list_id：带上次 ETag 的条件请求返回 304
+        etag = f'"list-{list_id}-{self.rss_entries}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.request_counts['rss_not_modified'] = self.request_counts.get('rss_not_modified', 0) + 1
+            return web.Response(status=304, headers={'ETag': etag})
+        items = []
+        for i in range(self.rss_entries):
+            status_id = 1900000000000000000 + int(list_id) * 1000 + i
+            items.append(f'''<item>
+<title>tweet {i}</title>
+<dc:creator>@user{i % 5}</dc:creator>
+<description><![CDATA[<p>Tweet {i} of list {list_id} about <a href="http://localhost:8080/search?q=%23AI">#AI</a> and a link <a href="http://localhost:8080/user{i % 5}/status/{status_id}#m">here</a></p><img src="http://localhost:8080/pic/{i}.jpg" />]]></description>
+<pubDate>Mon, 01 Jan 2025 00:{i % 60:02d}:00 GMT</pubDate>
+<guid>http://localhost:8080/user{i % 5}/status/{status_id}#m</guid>
+<link>http://localhost:8080/user{i % 5}/status/{status_id}#m</link>
+</item>''')
+        xml = f'''<?xml version="1.0" encoding="UTF-8"?>
+<rss xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0">
+<channel>
+<title>list {list_id}</title>
+<link>http://localhost:8080/i/lists/{list_id}</link>
+<description>fake nitter list</description>
+{''.join(items)}
+</channel>
+</rss>'''
+        return web.Response(text=xml, content_type='application/rss+xml',
+                            headers={'ETag': etag, 'Last-Modified': 'Mon, 01 Jan 2025 01:00:00 GMT'})
+
+    async def nitter_status(self, request):
+        failed = await self._handle('nitter')
+        if failed:
+            return failed
+        status_id = int(request.match_info['status_id'])
+        # 约三分之一的推文是 2~4 条的 thread
+        thread_len = 2 + status_id % 3 if status_id % 3 == 0 else 1
+        html = conversation_page(request.match_info['user'], status_id, thread_len, replies=5)
+        return web.Response(text=html, content_type='text/html')
+
+__all__ = ['FakeServices', 'DEFAULT_LATENCY', 'conversation_page']
@@ -0,0 +1,83 @@
+"""
+Grok 响应解析微基准
+
+生成指定大小的合成 NDJSON 响应（思考 token、正文 token、包含 <xaiArtifact> 的 modelResponse），
+对比原来的 splitlines + 逐行 json.loads + 拼接 + 正则 与现在的单次遍历实现的耗时和峰值内存：
+
+    python -m bench.parse --size-mb 8 --repeat 3
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from utils.grok_utils import extract_artifact_text
+
+def legacy_extract_artifact(response: str):
+    """改造前的实现：splitlines 后逐行解析、拼接全部回答、再对整个回答跑 DOTALL 正则"""
+    messages = []
+    for line in response.splitlines():
+        try:
+            parsed = json.loads(line)
+            msg = parsed.get("result", {}).get("response", {}).get("modelResponse", {}).get("message")
+            if msg:
+                messages.append(msg)
+        except (json.JSONDecodeError, KeyError, AttributeError):
+            continue
+    parsed_result = "".join(messages) if messages else None
+    if not parsed_result:
+        return None
+    matches = re.findall(r'<xaiArtifact[^>]*>(.*?)</xaiArtifact>', parsed_result, flags=re.DOTALL)
+    return "\n".join(matches) if matches else parsed_result
+
+def make_response(size_mb: float, artifact_kb: int = 64) -> str:
+    """生成约 size_mb 大小的响应：大部分是思考 token 行，最后是带 artifact 的完整回答"""
+    report = ('## 段落\n' + '这是一段合成的报告内容，用于测试解析性能。' * 20 + '\n') * max(1, artifact_kb * 1024 // 700)
+    message = f'开场白\n<xaiArtifact title="report" contentType="text/markdown">\n{report}</xaiArtifact>\n结束语'
+    lines = [json.dumps({'result': {'conversation': {'conversationId': 'bench'}}})]
+    token_line = json.dumps({'result': {'response': {'token': '思考中的一个片段 ', 'isThinking': True,
+                                                     'messageTag': 'header', 'responseId': 'bench'}}})
+    tail = [json.dumps({'result': {'response': {'token': message[i:i + 32], 'isThinking': False}}})
+            for i in range(0, len(message), 32)]
+    tail.append(json.dumps({'result': {'response': {'modelResponse': {'message': message}}}}))
+    target = size_mb * 1024 * 1024 - sum(len(line) + 1 for line in tail)
+    lines.extend([token_line] * max(0, int(target // (len(token_line) + 1))))
+    lines.extend(tail)
+    return '\n'.join(lines)
+
+def measure(func, response: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(response)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = func(response)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grok 响应解析微基准')
+    parser.add_argument('--size-mb', type=float, default=8, help='合成响应大小（MB）')
+    parser.add_argument('--artifact-kb', type=int, default=64, help='artifact 大小（KB）')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    response = make_response(args.size_mb, args.artifact_kb)
+    print(f'response={len(response) / 1024 / 1024:.1f} MB ({response.count(chr(10)) + 1} lines)')
+    results = {}
+    for name, func in (('legacy', legacy_extract_artifact), ('single-pass', extract_artifact_text)):
+        elapsed, peak, results[name] = measure(func, response, args.repeat)
+        print(f'{name:<12} best={elapsed * 1000:8.1f} ms  peak={peak / 1024 / 1024:7.2f} MiB')
+    if results['legacy'] != results['single-pass']:
+        print('结果不一致', file=sys.stderr)
+        return 1
+    print(f"artifact={len(results['single-pass']) / 1024:.0f} KB, 结果一致")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
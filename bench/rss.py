@@ -0,0 +1,95 @@
+"""
+RSS 条目转换微基准
+
+生成 N 条推文的合成 nitter RSS，对比原来逐条新建 html2text 并链式 replace 的实现
+与 entries_to_markdown（推文专用转换 / 复用同一个 html2text 转换器）的每秒条目数，
+以及 feedparser 使用 FEED_PARSE_OPTIONS 前后的解析耗时：
+
+    python -m bench.rss --entries 1000 --repeat 3
+"""
+
+import sys
+import time
+import argparse
+
+import html2text
+from feedparser import parse
+
+from utils.nitter import entries_to_markdown, html2text_converter, FEED_PARSE_OPTIONS
+
+def legacy_entries_to_markdown(entries) -> str:
+    """改造前 nitter_list_rss 的转换循环"""
+    result = []
+    for i, entry in enumerate(entries):
+        link = entry.link.replace('http://localhost:8080','x.com').replace('localhost:8080','x.com').replace('#m','')
+        text_maker = html2text.HTML2Text()
+        text_maker.ignore_images = True
+        text_maker.ignore_links = True
+        content = entry.description.replace('http://localhost:8080','x.com').replace('localhost:8080','x.com').replace('#m','')
+        content = text_maker.handle(content)
+        result.append(f"[{i}]({link})\n{content}\n---\n")
+    return "\n".join(result)
+
+def make_feed(entries: int) -> str:
+    """生成包含链接、话题、图片、换行和引用推文的 nitter list RSS"""
+    items = []
+    for i in range(entries):
+        status_id = 1900000000000000000 + i
+        quote = (f'<hr/><blockquote><b>@quoted{i % 7}</b>: quoted tweet &amp; more context about models '
+                 f'<a href="http://localhost:8080/quoted{i % 7}/status/{status_id - 1}#m">link</a></blockquote>'
+                 if i % 4 == 0 else '')
+        items.append(f'''<item>
+<title>tweet {i}</title>
+<dc:creator>@user{i % 50}</dc:creator>
+<description><![CDATA[<p>Tweet {i} about <a href="http://localhost:8080/search?q=%23AI">#AI</a> and
+<a href="http://localhost:8080/search?q=%23LLM">#LLM</a>: new open weights model beats the benchmark
+by a wide margin, details in the thread.<br><br>Paper: <a href="https://arxiv.org/abs/2501.{i:05d}">arxiv.org/abs/2501.{i:05d}</a>
+see <a href="http://localhost:8080/user{i % 50}/status/{status_id}#m">this</a></p>
+<img src="http://localhost:8080/pic/media%2F{i}.jpg" style="max-width:250px;" />{quote}]]></description>
+<pubDate>Mon, 01 Jan 2025 00:{i % 60:02d}:00 GMT</pubDate>
+<guid>http://localhost:8080/user{i % 50}/status/{status_id}#m</guid>
+<link>http://localhost:8080/user{i % 50}/status/{status_id}#m</link>
+</item>''')
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<rss xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0">
+<channel>
+<title>bench list</title>
+<link>http://localhost:8080/i/lists/1</link>
+<description>synthetic nitter list</description>
+{''.join(items)}
+</channel>
+</rss>'''
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='RSS 条目转换微基准')
+    parser.add_argument('--entries', type=int, default=1000, help='feed 中的条目数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    feed = make_feed(args.entries)
+    legacy_parse = best_of(lambda: parse(feed), args.repeat)
+    fast_parse = best_of(lambda: parse(feed, **FEED_PARSE_OPTIONS), args.repeat)
+    entries = parse(feed, **FEED_PARSE_OPTIONS).entries
+    print(f'entries={len(entries)}, feedparser {legacy_parse * 1000:.1f} ms -> '
+          f'{fast_parse * 1000:.1f} ms（不清理 HTML、不补全相对链接）')
+
+    runs = (
+        ('legacy', lambda: legacy_entries_to_markdown(entries)),
+        ('html2text-batch', lambda: entries_to_markdown(entries, html2text_converter())),
+        ('tweet-text', lambda: entries_to_markdown(entries)),
+    )
+    for name, func in runs:
+        elapsed = best_of(func, args.repeat)
+        print(f'{name:<16} {elapsed * 1000:8.1f} ms  {len(entries) / elapsed:10.0f} entries/s')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+thread 链接提取微基准
+
+用 bench.fake_services.conversation_page 生成约 N MB 的 nitter 对话页，对比原来的多次正则扫描实现
+与单次扫描的 extract_thread_links_nitter，分别测试三种页面：有 tweet-link 的对话页、
+没有 tweet-link 的页面（备用模式）、没有任何推文链接的页面：
+
+    python -m bench.threads --size-mb 5 --tweet-size 1000 --repeat 3
+"""
+
+import re
+import sys
+import time
+import logging
+import argparse
+
+from bench.fake_services import conversation_page
+from utils.nitter import extract_thread_links_nitter, XURL
+
+logger = logging.getLogger('bench.threads')
+
+def legacy_extract_thread_links(html_content: str) -> list:
+    """改造前的实现：每次调用编译正则，最多四次全文扫描，每个链接 split 两次"""
+    pattern = r'class="tweet-link" href="/([^"]+/status/\d+)#m"'
+    matches = re.findall(pattern, html_content)
+    logger.debug(f"正则表达式匹配到的原始链接: {matches}")
+    if not matches:
+        patterns = [
+            r'href="/([^"]+/status/\d+)#m"',
+            r'<a[^>]+href="/([^"]+/status/\d+)#m"[^>]*>',
+            r'class="tweet-link"[^>]+href="/([^"]+/status/\d+)#m"'
+        ]
+        for p in patterns:
+            matches = re.findall(p, html_content)
+            if matches:
+                break
+    if not matches:
+        return []
+    original_author = matches[0].split('/')[0]
+    continuous_tweets = []
+    current_sequence = []
+    for link in matches:
+        current_author = link.split('/')[0]
+        if current_author == original_author:
+            current_sequence.append(link)
+        else:
+            if len(current_sequence) > len(continuous_tweets):
+                continuous_tweets = current_sequence.copy()
+            current_sequence = []
+    if len(current_sequence) > len(continuous_tweets):
+        continuous_tweets = current_sequence
+    if not continuous_tweets:
+        return []
+    return [XURL + l for l in dict.fromkeys(continuous_tweets)]
+
+PAGES = ('tweet-link', 'fallback', 'no-links')
+
+def make_page(size_mb: float, kind: str = 'tweet-link', text_size: int = 1000) -> str:
+    """原作者 30 条 thread 加上大量回复，总大小约 size_mb；kind 见 PAGES"""
+    item_size = (len(conversation_page('author', 1, 1, 0, text_size))
+                 - len(conversation_page('author', 1, 0, 0, text_size)))
+    replies = max(0, int(size_mb * 1024 * 1024 / item_size) - 30)
+    page = conversation_page('author', 1900000000000000000, 30, replies, text_size)
+    if kind != 'tweet-link':
+        page = page.replace('class="tweet-link" ', '')
+    if kind == 'no-links':
+        page = page.replace('#m"', '"')
+    return page
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='thread 链接提取微基准')
+    parser.add_argument('--size-mb', type=float, default=5, help='对话页大小（MB）')
+    parser.add_argument('--tweet-size', type=int, default=1000, help='每条推文正文的字符数')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--page', choices=PAGES, action='append', help='只测试指定页面，可重复')
+    args = parser.parse_args(argv)
+    # 只比较解析本身，不输出两种实现的日志
+    logging.disable(logging.WARNING)
+
+    status = 0
+    for kind in args.page or PAGES:
+        page = make_page(args.size_mb, kind, args.tweet_size)
+        legacy = best_of(lambda: legacy_extract_thread_links(page), args.repeat)
+        single = best_of(lambda: extract_thread_links_nitter(page), args.repeat)
+        links = extract_thread_links_nitter(page)
+        same = legacy_extract_thread_links(page) == links
+        print(f'{kind:<11} page={len(page) / 1024 / 1024:.1f} MB  legacy={legacy * 1000:7.1f} ms  '
+              f'single-pass={single * 1000:7.1f} ms  ({legacy / single:.1f}x)  '
+              f'thread={len(links)} 条, {"结果一致" if same else "结果不一致"}')
+        if not same:
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
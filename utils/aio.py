@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """返回进程内共享的后台事件循环（首次调用时在守护线程中启动）
+
+    websocket、aiohttp session 等异步资源绑定在创建它们的事件循环上，
+    同步代码通过 run_sync 把协程提交到这个循环，资源就可以跨多次调用复用。
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=run, name='aio-loop', daemon=True).start()
+            ready.wait()
+            _loop = loop
+            logger.debug('后台事件循环已启动')
+        return _loop
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """在后台事件循环中执行协程并阻塞等待结果，可从任意非事件循环线程调用"""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError('run_sync 不能在后台事件循环内部调用，请直接 await')
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+def submit(coro: Coroutine) -> concurrent.futures.Future:
+    """把协程提交到后台事件循环但不等待，返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def iterate_sync(agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+    """把后台事件循环上的异步生成器包装成同步迭代器，提前结束迭代时会关闭异步生成器"""
+    async def next_item():
+        return await agen.__anext__()
+
+    try:
+        while True:
+            try:
+                item = run_sync(next_item(), timeout)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        run_sync(agen.aclose())
+
+__all__ = ['get_loop', 'run_sync', 'submit', 'iterate_sync']
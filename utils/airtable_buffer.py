@@ -0,0 +1,109 @@
+import time
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Airtable 单次批量更新最多 10 条记录
+AIRTABLE_BATCH_SIZE = 10
+
+class AirtableWriteBuffer:
+    """合并 Airtable 字段更新并批量写入
+
+    同一条记录多次 update 的字段会合并（后写覆盖先写），待写记录数达到 batch_size 时自动
+    通过 batch_update 一次写入最多 10 条记录；遇到 429/5xx 时指数退避重试。
+    进程正常退出时会通过 atexit 兜底 flush，任务结束时也应显式调用 flush()。
+    """
+    def __init__(self, table, batch_size: int = AIRTABLE_BATCH_SIZE, max_retries: int = 5,
+                 backoff: float = 1.0):
+        self.table = table
+        self.batch_size = max(1, min(batch_size, AIRTABLE_BATCH_SIZE))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def update(self, record_id: str, fields: Dict[str, Any]) -> None:
+        """登记一次字段更新，满一批时立即写入"""
+        with self._lock:
+            self._pending.setdefault(record_id, {}).update(fields)
+            full = len(self._pending) >= self.batch_size
+        logger.debug(f"[Airtable] 缓存记录 {record_id} 的字段更新: {list(fields)}")
+        if full:
+            self.flush(only_full_batches=True)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, only_full_batches: bool = False) -> None:
+        """写入缓存中的更新
+
+        Args:
+            only_full_batches: 为 True 时只写满 batch_size 的批次，剩余的留待下次
+        """
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending or (only_full_batches and len(self._pending) < self.batch_size):
+                        return
+                    record_ids = list(self._pending)[:self.batch_size]
+                    batch = [{'id': rid, 'fields': self._pending.pop(rid)} for rid in record_ids]
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    # 写入失败时放回缓存（不覆盖期间新登记的字段），交给下次 flush
+                    with self._lock:
+                        for item in batch:
+                            newer = self._pending.get(item['id'], {})
+                            self._pending[item['id']] = {**item['fields'], **newer}
+                    raise
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.timer('airtable_update'):
+                    self.table.batch_update(batch)
+                logger.info(f"[Airtable] 批量写入 {len(batch)} 条记录")
+                return
+            except Exception as e:
+                # pyairtable 抛出 requests.HTTPError，这里按 response 判断，避免导入 requests
+                response = getattr(e, 'response', None)
+                status = getattr(response, 'status_code', None)
+                if status not in (429, 500, 502, 503, 504) or attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(response, attempt)
+                logger.warning(f"[Airtable] 批量写入返回 {status}，{delay:.1f} 秒后重试（第{attempt+1}次）")
+                time.sleep(delay)
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        retry_after: Optional[str] = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Airtable 触发限流后需要等待 30 秒
+        if response.status_code == 429:
+            return max(30.0, self.backoff * (2 ** attempt))
+        return self.backoff * (2 ** attempt)
+
+    def close(self) -> None:
+        """写入剩余更新并取消 atexit 注册"""
+        try:
+            self.flush()
+        finally:
+            atexit.unregister(self.flush)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+__all__ = ['AirtableWriteBuffer', 'AIRTABLE_BATCH_SIZE']
@@ -0,0 +1,288 @@
+import os
+import time
+import json
+import shutil
+import atexit
+import asyncio
+import logging
+import subprocess
+import threading
+from typing import List, Optional, Tuple
+import requests
+from .metrics import metrics
+from .set_env import env_flag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = 'data/browser-profile'
+
+CHROME_CANDIDATES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+
+def browser_manager_enabled() -> bool:
+    return env_flag('BROWSER_MANAGED')
+
+def find_chrome_executable() -> str:
+    """按 CHROME_PATH、zendriver/nodriver 的查找逻辑、PATH 的顺序查找 Chrome"""
+    path = os.getenv('CHROME_PATH')
+    if path:
+        return path
+    for module in ('zendriver.core.config', 'nodriver.core.config'):
+        try:
+            config = __import__(module, fromlist=['find_chrome_executable'])
+            return str(config.find_chrome_executable())
+        except Exception:
+            continue
+    for name in CHROME_CANDIDATES:
+        found = shutil.which(name)
+        if found:
+            return found
+    raise FileNotFoundError('未找到 Chrome，请设置 CHROME_PATH')
+
+class ManagedBrowser:
+    """由本进程启动（或复用已在该端口运行）的 Chrome 实例，使用持久化的用户目录保存登录状态"""
+    def __init__(self, port: int, profile_dir: str, headless: bool = True,
+                 executable: Optional[str] = None):
+        self.port = port
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.executable = executable
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    @property
+    def launched(self) -> bool:
+        """是否由本进程启动（复用的外部浏览器使用的不是 profile_dir，不能由本进程关闭或重启）"""
+        return self.process is not None
+
+    def is_alive(self) -> bool:
+        try:
+            return requests.get(f'{self.endpoint}/json/version', timeout=2).ok
+        except requests.RequestException:
+            return False
+
+    def start(self, timeout: float = 30) -> None:
+        """端口上已有可用的浏览器时直接复用，否则启动新进程并等待调试端口就绪"""
+        if self.is_alive():
+            logger.info(f'[Browser] 复用已运行的浏览器 {self.endpoint}')
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        executable = self.executable or find_chrome_executable()
+        args = [
+            executable,
+            f'--remote-debugging-port={self.port}',
+            f'--user-data-dir={os.path.abspath(self.profile_dir)}',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--disable-dev-shm-usage',
+            '--disable-background-networking',
+            '--disable-renderer-backgrounding',
+        ]
+        if self.headless:
+            args += ['--headless=new', '--disable-gpu']
+        if hasattr(os, 'geteuid') and os.geteuid() == 0:
+            args.append('--no-sandbox')
+        args.append('about:blank')
+        logger.info(f'[Browser] 启动浏览器 {self.endpoint}，用户目录 {self.profile_dir}')
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'浏览器启动失败，退出码 {self.process.returncode}')
+            if self.is_alive():
+                metrics.incr('browser_started')
+                return
+            time.sleep(0.2)
+        self.stop()
+        raise TimeoutError(f'等待浏览器调试端口 {self.port} 超时')
+
+    def stop(self, timeout: float = 10) -> None:
+        """结束本进程启动的浏览器；复用的外部浏览器保持运行"""
+        if not self.launched:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        logger.info(f'[Browser] 已关闭浏览器 {self.endpoint}')
+
+    def restart(self) -> None:
+        """重启本进程启动的浏览器；外部浏览器的登录状态不在 profile_dir 中，只记录警告"""
+        if not self.launched:
+            logger.warning(f'[Browser] {self.endpoint} 不是本进程启动的浏览器，不重启')
+            return
+        self.stop()
+        # 等待旧进程释放用户目录锁
+        deadline = time.monotonic() + 10
+        while self.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.2)
+        self.start()
+        metrics.incr('browser_restarted')
+
+    async def _browser_command(self, method: str, params: Optional[dict] = None) -> dict:
+        import websockets
+        ws_url = requests.get(f'{self.endpoint}/json/version', timeout=5).json()['webSocketDebuggerUrl']
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            await ws.send(json.dumps({'id': 1, 'method': method, 'params': params or {}}))
+            try:
+                while True:
+                    data = json.loads(await ws.recv())
+                    if data.get('id') == 1:
+                        return data
+            except websockets.ConnectionClosed:
+                return {}
+
+    async def _page_heap(self, ws_url: str) -> int:
+        import websockets
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            for msg_id, method in ((1, 'Performance.enable'), (2, 'Performance.getMetrics')):
+                await ws.send(json.dumps({'id': msg_id, 'method': method}))
+            while True:
+                data = json.loads(await ws.recv())
+                if data.get('id') == 2:
+                    break
+        for metric in data.get('result', {}).get('metrics', []):
+            if metric.get('name') == 'JSHeapTotalSize':
+                return int(metric.get('value', 0))
+        return 0
+
+    async def process_memory_mb(self) -> Optional[float]:
+        """SystemInfo.getProcessInfo 列出的浏览器、渲染、GPU 进程的常驻内存之和（读取 /proc，仅限本机 Linux）"""
+        result = await self._browser_command('SystemInfo.getProcessInfo')
+        processes = result.get('result', {}).get('processInfo', [])
+        total_kb = 0
+        found = False
+        for process in processes:
+            try:
+                with open(f"/proc/{process['id']}/status") as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            found = True
+                            break
+            except (OSError, KeyError, ValueError):
+                continue
+        return total_kb / 1024 if found else None
+
+    async def memory_mb(self) -> float:
+        """浏览器内存（MB）：优先取各进程常驻内存之和，无法读取时用所有页面 JS 堆之和"""
+        try:
+            rss = await self.process_memory_mb()
+            if rss is not None:
+                return rss
+        except Exception as e:
+            logger.debug(f'[Browser] 读取进程内存失败，改用JS堆: {e}')
+        return await self.heap_mb()
+
+    async def heap_mb(self) -> float:
+        """所有页面 JS 堆（Performance.getMetrics 的 JSHeapTotalSize）之和，单位 MB"""
+        pages = await asyncio.to_thread(
+            lambda: requests.get(f'{self.endpoint}/json', timeout=5).json())
+        urls = [p['webSocketDebuggerUrl'] for p in pages if p.get('type') == 'page' and p.get('webSocketDebuggerUrl')]
+        sizes = await asyncio.gather(*(asyncio.wait_for(self._page_heap(url), 10) for url in urls),
+                                     return_exceptions=True)
+        return sum(size for size in sizes if isinstance(size, int)) / 1024 / 1024
+
+class BrowserManager:
+    """管理若干个本地 Chrome 实例，供 GrokTabCluster 使用
+
+    每个实例使用独立端口（BROWSER_BASE_PORT 起递增）和独立的持久化用户目录
+    （BROWSER_PROFILE_DIR/instance-N，首次使用需在该目录中登录 grok.com）。
+    ensure_running 会启动已退出的实例，并重启内存（见 ManagedBrowser.memory_mb）超过 BROWSER_MAX_MEMORY_MB 的实例；
+    重启会关闭该浏览器中的所有 tab，应在没有进行中的提问时调用。端口上复用的外部浏览器不会被重启，只记录警告。
+    运行期间 GrokTabPool 回收 tab 时用 needs_restart 检查内存，超过上限时等该浏览器上的提问结束后再调用 ensure_running。
+
+    Args:
+        count: 实例数，默认读取 BROWSER_INSTANCES
+        base_port: 第一个实例的调试端口，默认读取 BROWSER_BASE_PORT
+        profile_dir: 用户目录根路径，默认读取 BROWSER_PROFILE_DIR
+        max_memory_mb: 内存上限，默认读取 BROWSER_MAX_MEMORY_MB
+        headless: 是否无头运行，默认读取 BROWSER_HEADLESS
+        tabs: 每个实例的 tab 上限，默认读取 BROWSER_TABS（未设置时同 GrokTabPool）
+    """
+    def __init__(self, count: Optional[int] = None, base_port: Optional[int] = None,
+                 profile_dir: Optional[str] = None, max_memory_mb: Optional[float] = None,
+                 headless: Optional[bool] = None, tabs: Optional[int] = None):
+        count = count or int(os.getenv('BROWSER_INSTANCES', '1'))
+        base_port = base_port or int(os.getenv('BROWSER_BASE_PORT', '9223'))
+        profile_dir = profile_dir or os.getenv('BROWSER_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+        self.max_memory_mb = max_memory_mb or float(os.getenv('BROWSER_MAX_MEMORY_MB', '2048'))
+        if headless is None:
+            headless = env_flag('BROWSER_HEADLESS', True)
+        self.tabs = tabs or (int(os.getenv('BROWSER_TABS')) if os.getenv('BROWSER_TABS') else None)
+        self.browsers = [
+            ManagedBrowser(base_port + i, os.path.join(profile_dir, f'instance-{i}'), headless)
+            for i in range(max(1, count))
+        ]
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def endpoints(self) -> List[Tuple[str, Optional[int]]]:
+        """与 get_cdp_endpoints 相同格式的 [(地址, tab 上限)]"""
+        return [(browser.endpoint, self.tabs) for browser in self.browsers]
+
+    def ensure_running(self, endpoint: Optional[str] = None, check_memory: bool = True) -> None:
+        """启动未运行的实例，重启内存超过上限的实例；指定 endpoint 时只处理该实例"""
+        with self._lock:
+            for browser in self.browsers:
+                if endpoint and browser.endpoint != endpoint.rstrip('/'):
+                    continue
+                if not browser.is_alive():
+                    if browser.process is not None:
+                        logger.warning(f'[Browser] 浏览器 {browser.endpoint} 已退出，重新启动')
+                        browser.process = None
+                        metrics.incr('browser_restarted')
+                    browser.start()
+                    continue
+                if check_memory and self._over_limit(browser):
+                    logger.info(f'[Browser] {browser.endpoint} 内存超过 {self.max_memory_mb:.0f}MB，重启')
+                    browser.restart()
+
+    def _over_limit(self, browser: ManagedBrowser) -> bool:
+        # 读取失败或不是本进程启动的浏览器时返回 False（不能重启）
+        try:
+            memory = asyncio.run(browser.memory_mb())
+        except Exception as e:
+            logger.warning(f'[Browser] 读取 {browser.endpoint} 内存失败: {e}')
+            return False
+        logger.info(f'[Browser] {browser.endpoint} 内存 {memory:.0f}MB')
+        if memory <= self.max_memory_mb:
+            return False
+        if not browser.launched:
+            metrics.incr('browser_restart_skipped')
+            logger.warning(f'[Browser] {browser.endpoint} 内存超过 {self.max_memory_mb:.0f}MB，'
+                           f'但不是本进程启动的浏览器（登录状态不在 {browser.profile_dir}），不重启')
+            return False
+        return True
+
+    def needs_restart(self, endpoint: str) -> bool:
+        """endpoint 对应的实例是否由本进程启动且内存超过上限（只读取内存，不重启，进行中的提问不受影响）"""
+        for browser in self.browsers:
+            if browser.endpoint == endpoint.rstrip('/'):
+                with self._lock:
+                    return browser.is_alive() and self._over_limit(browser)
+        return False
+
+    def stop(self) -> None:
+        """关闭本进程启动的浏览器（复用的外部浏览器保持运行）"""
+        with self._lock:
+            for browser in self.browsers:
+                browser.stop()
+
+_manager: Optional[BrowserManager] = None
+_manager_lock = threading.Lock()
+
+def get_browser_manager() -> BrowserManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BrowserManager()
+        return _manager
+
+__all__ = ['BrowserManager', 'ManagedBrowser', 'get_browser_manager', 'browser_manager_enabled',
+           'find_chrome_executable']
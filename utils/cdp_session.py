@@ -0,0 +1,175 @@
+import re
+import json
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 事件消息以 {"method":"Domain.event" 开头，只用正则取出方法名，没有订阅者的事件不做 JSON 解析
+EVENT_METHOD = re.compile(r'\{\s*"method"\s*:\s*"([^"]+)"')
+
+class CDPSession:
+    """单一读取者的 CDP websocket 会话
+
+    后台任务是 websocket 唯一的读取者：命令回复按 id 交给对应的 Future，事件按方法名分发给订阅者，
+    没有订阅者的事件（例如开启 Network 后大量的 Network.dataReceived）在 JSON 解析前就被丢弃。
+    订阅时还可以提供 raw_filter，对原始文本做子串判断，只关心特定请求时其余事件同样不解析。
+    多个命令可以同时等待回复，命令执行期间到达的事件也不会丢失。
+    """
+    def __init__(self, ws):
+        self.ws = ws
+        self._next_id = 1
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._handlers: Dict[str, list] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self.events_received = 0
+        self.events_dropped = 0
+
+    def start(self):
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read_loop())
+        return self
+
+    @property
+    def closed(self) -> bool:
+        return self._error is not None
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                self._dispatch(raw)
+            self._shutdown(ConnectionError('CDP websocket已关闭'))
+        except asyncio.CancelledError:
+            self._shutdown(ConnectionError('CDP会话已关闭'))
+            raise
+        except Exception as e:
+            self._shutdown(ConnectionError(f'CDP websocket读取失败: {e}'))
+
+    def _dispatch(self, raw):
+        match = EVENT_METHOD.match(raw)
+        if match:
+            self.events_received += 1
+            handlers = self._handlers.get(match.group(1))
+            if not handlers or not any(raw_filter is None or raw_filter(raw) for _, raw_filter in handlers):
+                self.events_dropped += 1
+                return
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f'无法解析的CDP消息: {raw[:200]}')
+            return
+
+        msg_id = data.get('id')
+        if msg_id is not None:
+            future = self._pending.pop(msg_id, None)
+            if future and not future.done():
+                future.set_result(data)
+            return
+        for handler, raw_filter in list(self._handlers.get(data.get('method'), ())):
+            if raw_filter is not None and not raw_filter(raw):
+                continue
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"处理CDP事件 {data.get('method')} 出错: {e}")
+
+    def _shutdown(self, error: BaseException):
+        if self._error is not None:
+            return
+        self._error = error
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        # 通知仍在等待事件的订阅者
+        for handlers in list(self._handlers.values()):
+            for handler, _ in list(handlers):
+                try:
+                    handler(None)
+                except Exception:
+                    pass
+        metrics.incr('cdp_events_received', self.events_received)
+        metrics.incr('cdp_events_dropped', self.events_dropped)
+
+    async def send(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        """发送命令并等待回复，返回完整的回复消息（包含 result 或 error）"""
+        if self._error is not None:
+            raise self._error
+        msg_id = self._next_id
+        self._next_id += 1
+        msg = {"id": msg_id, "method": method}
+        if params:
+            msg["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self.ws.send(json.dumps(msg))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def on(self, method: str, handler: Callable[[Optional[Dict]], Any],
+           raw_filter: Optional[Callable[[str], bool]] = None) -> Callable[[], None]:
+        """订阅事件，返回取消订阅的函数；会话关闭时 handler 会收到 None
+
+        raw_filter 接收事件的原始 JSON 文本，返回 False 的事件不解析也不交给 handler。
+        """
+        entry = (handler, raw_filter)
+        self._handlers.setdefault(method, []).append(entry)
+
+        def off():
+            handlers = self._handlers.get(method)
+            if handlers and entry in handlers:
+                handlers.remove(entry)
+                if not handlers:
+                    del self._handlers[method]
+        return off
+
+    def expect(self, method: str, predicate: Optional[Callable[[Dict], bool]] = None) -> asyncio.Future:
+        """在触发动作之前调用，返回下一个满足 predicate 的事件的 Future"""
+        future = asyncio.get_running_loop().create_future()
+        if self._error is not None:
+            future.set_exception(self._error)
+            return future
+
+        def handler(data):
+            if future.done():
+                return
+            if data is None:
+                future.set_exception(self._error)
+            elif predicate is None or predicate(data):
+                future.set_result(data)
+
+        off = self.on(method, handler)
+        future.add_done_callback(lambda _: off())
+        return future
+
+    @contextmanager
+    def listen(self, *methods: str, raw_filters: Optional[Dict[str, Callable[[str], bool]]] = None):
+        """在 with 块内把指定事件按到达顺序放入队列；会话关闭时队列收到 None
+
+        raw_filters 按方法名提供 raw_filter（见 on）。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        raw_filters = raw_filters or {}
+        offs = [self.on(method, queue.put_nowait, raw_filters.get(method)) for method in methods]
+        try:
+            yield queue
+        finally:
+            for off in offs:
+                off()
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._shutdown(ConnectionError('CDP会话已关闭'))
+
+__all__ = ['CDPSession']
@@ -1,23 +1,67 @@
+import os
 import requests
 import logging
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
 
-resp = requests.get('http://127.0.0.1:9223/json')
-pages = resp.json()
+def get_cdp_endpoint():
+    """Chrome 远程调试地址，可通过环境变量 CDP_ENDPOINT 覆盖（例如压测时指向本地假服务）
+
+    每次调用时读取，导入模块时不访问浏览器。
+    """
+    return os.getenv('CDP_ENDPOINT', 'http://127.0.0.1:9223').rstrip('/')
+
+def get_cdp_endpoints() -> List[Tuple[str, Optional[int]]]:
+    """所有可用的 Chrome 远程调试地址及各自的 tab 上限
+
+    环境变量 CDP_ENDPOINTS 以逗号分隔多个地址，地址后可用 =N 指定该浏览器最多同时打开的 tab 数，
+    例如 "http://127.0.0.1:9223=3,http://10.0.0.2:9223=2"；未设置时只使用 CDP_ENDPOINT。
+    设置 BROWSER_MANAGED=1 时改用本进程管理的浏览器（见 utils.browser_manager）。
+    """
+    from .browser_manager import browser_manager_enabled, get_browser_manager
+    if browser_manager_enabled():
+        return get_browser_manager().endpoints()
+    value = os.getenv('CDP_ENDPOINTS', '').strip()
+    if not value:
+        return [(get_cdp_endpoint(), None)]
+    endpoints = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, cap = item.rpartition('=')
+        if url and cap.isdigit():
+            endpoints.append((url.rstrip('/'), int(cap)))
+        else:
+            endpoints.append((item.rstrip('/'), None))
+    return endpoints
+
+def list_pages(endpoint: Optional[str] = None):
+    """列出浏览器当前的所有 target"""
+    resp = requests.get(f'{endpoint or get_cdp_endpoint()}/json')
+    return resp.json()
+
+def _fix_ws_url(ws_url: str, endpoint: str) -> str:
+    # Chrome 返回的地址可能缺少端口，或者是远程机器自己的 127.0.0.1，改用实际连接的 host:port
+    ws = urlsplit(ws_url)
+    target = urlsplit(endpoint)
+    if ws.port is None or (ws.hostname in ('127.0.0.1', 'localhost') and target.hostname not in ('127.0.0.1', 'localhost')):
+        ws_url = ws._replace(netloc=target.netloc).geturl()
+    return ws_url
 
 # 新建tab（target）
-def create_new_tab():
-    url = 'http://127.0.0.1:9223/json/new?url=https://grok.com'
+def create_new_tab(endpoint: Optional[str] = None):
+    endpoint = endpoint or get_cdp_endpoint()
+    url = f'{endpoint}/json/new?url=https://grok.com'
     resp = requests.put(url)
-    ws_url = resp.json()['webSocketDebuggerUrl']
-    if ws_url.startswith('ws://127.0.0.1/devtools'):
-        ws_url = ws_url.replace('ws://127.0.0.1/', 'ws://127.0.0.1:9223/')
+    ws_url = _fix_ws_url(resp.json()['webSocketDebuggerUrl'], endpoint)
     logging.info(f'新建tab ws_url: {ws_url}')
     return ws_url
 
-def close_tab_by_ws_url(ws_url):
+def close_tab_by_ws_url(ws_url, endpoint: Optional[str] = None):
     # ws_url: ws://127.0.0.1:9223/devtools/page/xxx
     page_id = ws_url.split('/')[-1]
-    close_url = f'http://127.0.0.1:9223/json/close/{page_id}'
+    close_url = f'{endpoint or get_cdp_endpoint()}/json/close/{page_id}'
     logging.info(f'关闭tab: {close_url}')
     resp = requests.get(close_url)
     logging.info(f'关闭tab响应: {resp.text}')
@@ -0,0 +1,91 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Iterable, Optional, Set, Tuple
+from .metrics import metrics
+from .local_store import SQLiteStore, SharedInstance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = 'data/feed_state.sqlite3'
+
+def _hash64(value: str) -> int:
+    # 8 字节哈希作为整数键，索引比保存完整的 guid/地址小得多
+    return int.from_bytes(hashlib.sha1(value.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+class FeedState(SQLiteStore):
+    """记录每个 feed 已经用过的条目（guid 与发布时间），用于只取上次运行之后的新推文
+
+    条目按 (feed, guid) 的 64 位哈希保存在 SQLite 中。超过 ttl 秒的记录过期删除，
+    每个 feed 最多保留 max_entries 条（按发布时间淘汰最旧的），索引大小有上限。
+
+    Args:
+        path: 状态文件，默认读取 FEED_STATE_PATH
+        ttl: 记录保留时间（秒），默认读取 FEED_STATE_TTL
+        max_entries: 每个 feed 最多保留的记录数，默认读取 FEED_STATE_MAX_ENTRIES
+    """
+    SCHEMA = ('''
+        CREATE TABLE IF NOT EXISTS feed_seen (
+            feed INTEGER NOT NULL,
+            guid INTEGER NOT NULL,
+            published REAL NOT NULL,
+            seen_at REAL NOT NULL,
+            PRIMARY KEY (feed, guid)
+        ) WITHOUT ROWID
+    ''', 'CREATE INDEX IF NOT EXISTS feed_seen_seen_at ON feed_seen (seen_at)')
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        super().__init__(path or os.getenv('FEED_STATE_PATH', DEFAULT_STATE_PATH))
+        self.ttl = ttl if ttl is not None else float(os.getenv('FEED_STATE_TTL', str(14 * 86400)))
+        self.max_entries = max_entries or int(os.getenv('FEED_STATE_MAX_ENTRIES', '5000'))
+
+    def seen(self, feed: str, guids: Iterable[str]) -> Set[str]:
+        """返回 guids 中已经记录过的"""
+        by_hash = {_hash64(guid): guid for guid in guids}
+        if not by_hash:
+            return set()
+        feed_key = _hash64(feed)
+        found = set()
+        keys = list(by_hash)
+        with self._lock:
+            # 分批查询，避免超过 SQLite 的参数个数上限
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT guid FROM feed_seen WHERE feed = ? AND guid IN ({','.join('?' * len(batch))})",
+                    (feed_key, *batch),
+                ).fetchall()
+                found.update(by_hash[row[0]] for row in rows)
+        return found
+
+    def mark_seen(self, feed: str, entries: Iterable[Tuple[str, Optional[float]]]) -> None:
+        """记录 (guid, 发布时间戳) 并清理过期和超出上限的记录"""
+        now = time.time()
+        feed_key = _hash64(feed)
+        rows = [(feed_key, _hash64(guid), published or now, now) for guid, published in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO feed_seen (feed, guid, published, seen_at) VALUES (?, ?, ?, ?)', rows
+            )
+            self._prune(feed_key, now)
+
+    def _prune(self, feed_key: int, now: float) -> None:
+        expired = self._conn.execute('DELETE FROM feed_seen WHERE seen_at < ?', (now - self.ttl,)).rowcount
+        evicted = self._conn.execute('''
+            DELETE FROM feed_seen WHERE feed = ? AND guid IN (
+                SELECT guid FROM feed_seen WHERE feed = ? ORDER BY published DESC LIMIT -1 OFFSET ?
+            )
+        ''', (feed_key, feed_key, self.max_entries)).rowcount
+        if expired or evicted:
+            metrics.incr('feed_state_pruned', expired + evicted)
+            logger.info(f"[FeedState] 清理过期 {expired} 条，淘汰 {evicted} 条")
+
+_state = SharedInstance(FeedState)
+
+def get_feed_state() -> FeedState:
+    """进程内共享的 feed 状态"""
+    return _state.get()
+
+__all__ = ['FeedState', 'get_feed_state']
@@ -0,0 +1,156 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+from .metrics import metrics
+from .set_env import env_flag
+from .local_store import SQLiteStore, SharedInstance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'data/grok_cache.sqlite3'
+DEFAULT_TTL = 6 * 3600
+
+def normalize_prompt(prompt: str) -> str:
+    """统一换行、Unicode 形式和空白，只有空白差异的 prompt 视为同一个问题"""
+    prompt = unicodedata.normalize('NFC', prompt.replace('\r\n', '\n'))
+    lines = [re.sub(r'[ \t]+', ' ', line).strip() for line in prompt.split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+def cache_key(prompt: str, deepsearch: bool) -> str:
+    data = f"{'deepsearch' if deepsearch else 'quick'}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+class GrokAnswerCache(SQLiteStore):
+    """以 prompt 内容为键的 Grok 回答本地 SQLite 缓存
+
+    键是规范化后的 prompt 与 deepsearch 开关的 sha256，值是原始响应和提取出的报告。
+    超过 ttl 秒的条目失效；总大小超过 max_mb 时按最近访问时间淘汰（LRU）。
+    同一个键同时只会有一次 Grok 调用，其他线程等待并共享结果。
+
+    Args:
+        path: 缓存文件，默认读取 GROK_CACHE_PATH
+        ttl: 有效期（秒），默认读取 GROK_CACHE_TTL，为 0 时不缓存
+        max_mb: 缓存大小上限（MB），默认读取 GROK_CACHE_MAX_MB
+    """
+    SCHEMA = ('''
+        CREATE TABLE IF NOT EXISTS grok_cache (
+            key TEXT PRIMARY KEY,
+            raw TEXT NOT NULL,
+            artifact TEXT,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    ''', 'CREATE INDEX IF NOT EXISTS grok_cache_accessed ON grok_cache (accessed_at)')
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_mb: Optional[float] = None):
+        super().__init__(path or os.getenv('GROK_CACHE_PATH', DEFAULT_CACHE_PATH))
+        # 默认远小于每日任务的间隔：只在同一次运行和当天的重试中去重，第二天相同的 prompt 会重新深度搜索
+        self.ttl = ttl if ttl is not None else float(os.getenv('GROK_CACHE_TTL', str(DEFAULT_TTL)))
+        self.max_bytes = int((max_mb if max_mb is not None else float(os.getenv('GROK_CACHE_MAX_MB', '200'))) * 1024 * 1024)
+        self._inflight: Dict[str, Future] = {}
+        logger.info(f"[GrokCache] 使用缓存文件: {self.path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """返回未过期的 (原始响应, 报告)，并刷新访问时间"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT raw, artifact, created_at FROM grok_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw, artifact, created_at = row
+            if created_at < now - self.ttl:
+                self._conn.execute('DELETE FROM grok_cache WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE grok_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return raw, artifact
+
+    def put(self, key: str, raw: str, artifact: Optional[str]) -> None:
+        size = len(raw.encode('utf-8')) + len((artifact or '').encode('utf-8'))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO grok_cache (key, raw, artifact, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', (key, raw, artifact, size, now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute('DELETE FROM grok_cache WHERE created_at < ?', (now - self.ttl,)).rowcount
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM grok_cache').fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for key, size in self._conn.execute(
+                'SELECT key, size FROM grok_cache ORDER BY accessed_at'
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute('DELETE FROM grok_cache WHERE key = ?', (key,))
+                total -= size
+                evicted += 1
+        if expired or evicted:
+            logger.info(f"[GrokCache] 清理过期 {expired} 条，淘汰 {evicted} 条")
+
+    def get_or_compute(self, prompt: str, deepsearch: bool,
+                       compute: Callable[[], Tuple[Optional[str], Optional[str], bool]],
+                       bypass: bool = False) -> Tuple[Optional[str], Optional[str], bool]:
+        """读取缓存，未命中时调用 compute 得到 (原始响应, 报告, 是否可缓存) 并写入缓存
+
+        bypass 为 True 时不读取缓存，但仍会用新结果刷新缓存。只缓存提取到报告且可缓存的结果。
+        返回 (原始响应, 报告, 是否来自缓存)。
+        """
+        key = cache_key(prompt, deepsearch)
+        if not bypass:
+            cached = self.get(key)
+            if cached is not None:
+                metrics.incr('grok_cache_hit')
+                logger.info(f"[GrokCache] 命中缓存 {key[:12]}")
+                return cached[0], cached[1], True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            metrics.incr('grok_cache_merged')
+            logger.info(f"[GrokCache] 相同问题正在进行，等待结果 {key[:12]}")
+            raw, artifact = future.result()
+            return raw, artifact, True
+
+        metrics.incr('grok_cache_miss')
+        try:
+            raw, artifact, cacheable = compute()
+            if raw and artifact and cacheable:
+                self.put(key, raw, artifact)
+            future.set_result((raw, artifact))
+            return raw, artifact, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+_cache = SharedInstance(GrokAnswerCache)
+
+def get_answer_cache() -> GrokAnswerCache:
+    """进程内共享的回答缓存"""
+    return _cache.get()
+
+def cache_bypassed() -> bool:
+    return env_flag('GROK_CACHE_BYPASS')
+
+__all__ = ['GrokAnswerCache', 'get_answer_cache', 'cache_key', 'normalize_prompt', 'cache_bypassed']
@@ -1,10 +1,23 @@
+import os
+import base64
+import codecs
 import asyncio
 import json
+import time
 import logging
 import websockets
-from typing import Optional, Dict, Any
-from .cdp_tools import create_new_tab, close_tab_by_ws_url
-from .grok_utils import FIND_ELEMENT_JS,parse_grok_result
+from contextlib import asynccontextmanager
+from collections import deque
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Deque, Iterator, List, Tuple
+from .aio import run_sync, submit, iterate_sync
+from .cdp_tools import create_new_tab, close_tab_by_ws_url, get_cdp_endpoints
+from .cdp_session import CDPSession
+from .browser_manager import browser_manager_enabled, get_browser_manager
+from .grok_utils import (GrokStreamParser, element_js, wait_for_element_js, extract_artifact_text,
+                         find_conversation_id)
+from .grok_cache import get_answer_cache, cache_bypassed, cache_key
+from .metrics import metrics
+from .set_env import env_flag
 
 # 设置 websockets 库的日志级别为 INFO
 logging.getLogger('websockets').setLevel(logging.INFO)
@@ -12,51 +25,157 @@ logging.getLogger('websockets').setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+GROK_CHAT_URL = "https://grok.com/chat#private"
+GROK_CHAT_API = '/rest/app-chat/conversations/new'
+# 同一对话中的追问
+GROK_RESPONSES_API = '/rest/app-chat/conversations/{}/responses'
+GROK_ANSWER_TIMEOUT = 900
+
+# 精简 tab：拦截与提问无关的图片、字体、媒体和统计脚本，缩短页面加载并减少 CDP 事件
+DEFAULT_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*sentry.io*', '*mixpanel.com*', '*segment.io*', '*/cdn-cgi/rum*',
+]
+
+def lean_tab_enabled() -> bool:
+    return env_flag('GROK_LEAN_TAB', True)
+
+def blocked_url_patterns() -> List[str]:
+    """需要拦截的 URL 通配符，可通过 GROK_BLOCKED_URLS（逗号分隔）覆盖"""
+    value = os.getenv('GROK_BLOCKED_URLS')
+    if value is None:
+        return DEFAULT_BLOCKED_URLS
+    return [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+
+def chat_api_path(conversation_id: Optional[str] = None) -> str:
+    """新对话的提问发往 GROK_CHAT_API，追问发往该对话的 GROK_RESPONSES_API"""
+    return GROK_RESPONSES_API.format(conversation_id) if conversation_id else GROK_CHAT_API
+
+# 点击发送
+JS_CLICK_SEND = element_js('submit', "if(!el)return 'notfound';el.click();return 'clicked';")
+
+class ChatRequestFilter:
+    """只解析与 Grok 对话接口相关的网络事件（配合 CDPSession.listen 的 raw_filters）
+
+    requestWillBeSent 只解析 URL 含 api（默认 GROK_CHAT_API，追问时为对话的 responses 接口）的请求，
+    其余事件在确定目标请求后只解析该 requestId 的。
+    """
+    METHODS = ('Network.requestWillBeSent', 'Network.dataReceived',
+               'Network.loadingFinished', 'Network.loadingFailed')
+
+    def __init__(self, api: str = GROK_CHAT_API):
+        self.api = api
+        self.request_id: Optional[str] = None
+
+    def _request(self, raw: str) -> bool:
+        return self.api in raw
+
+    def _response(self, raw: str) -> bool:
+        return self.request_id is not None and f'"{self.request_id}"' in raw
+
+    def raw_filters(self, methods) -> Dict[str, Callable[[str], bool]]:
+        return {method: self._request if method == 'Network.requestWillBeSent' else self._response
+                for method in methods}
+
 class GrokClient:
-    def __init__(self):
+    def __init__(self, endpoint: Optional[str] = None):
+        self.endpoint = endpoint
         self.ws_url = None
         self.ws = None
-        self.msg_id = 1
+        self.session: Optional[CDPSession] = None
+        self.uses = 0
+        # 当前页面上对话的 id，提问后从 /conversations/new 的响应中取得，reset 后清空
+        self.conversation_id: Optional[str] = None
 
     async def __aenter__(self):
-        self.ws_url = create_new_tab()
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        """新建 tab 并连接 websocket"""
+        self.ws_url = await asyncio.to_thread(create_new_tab, self.endpoint)
         self.ws = await websockets.connect(self.ws_url, max_size=None)
+        self.session = CDPSession(self.ws).start()
         await self._send_message("Page.enable")
         await self._send_message("Network.enable")
-        return self
+        await self._send_message("Performance.enable")
+        if lean_tab_enabled():
+            patterns = blocked_url_patterns()
+            if patterns:
+                await self._send_message("Network.setBlockedURLs", {"urls": patterns})
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
+    async def close(self):
+        """断开 websocket 并关闭 tab"""
+        if self.session:
+            await self.session.close()
+            self.session = None
         if self.ws:
-            await self.ws.close()
+            try:
+                await self.ws.close()
+            except Exception as e:
+                logger.debug(f'关闭websocket出错: {e}')
+            self.ws = None
         if self.ws_url:
-            close_tab_by_ws_url(self.ws_url)
-            logger.debug('已关闭tab')
+            try:
+                await asyncio.to_thread(close_tab_by_ws_url, self.ws_url, self.endpoint)
+                logger.debug('已关闭tab')
+            except Exception as e:
+                logger.warning(f'关闭tab失败: {e}')
+            self.ws_url = None
 
-    async def _send_message(self, method: str, params: Optional[Dict] = None) -> Dict:
-        """发送消息到 Chrome DevTools Protocol"""
-        msg = {"id": self.msg_id, "method": method}
-        if params:
-            msg["params"] = params
+    async def reset(self):
+        """打开新的私密对话，供下一个问题使用
 
-        await self.ws.send(json.dumps(msg))
-        self.msg_id += 1
+        记录从导航开始到输入框可用的时间（grok_tti）和期间收到的 CDP 事件数（grok_page_load_events）。
+        """
+        start = time.perf_counter()
+        events_before = self.session.events_received
+        self.conversation_id = None
+        await self.navigate(GROK_CHAT_URL)
+        ready = await self.wait_for_element('textarea', timeout=10)
+        metrics.observe('grok_tti', time.perf_counter() - start, bool(ready))
+        metrics.incr('grok_page_load_events', self.session.events_received - events_before)
 
-        while True:
-            resp = await self.ws.recv()
-            data = json.loads(resp)
-            if data.get('id') == self.msg_id - 1:
-                return data
+    async def health_check(self, timeout: float = 5) -> bool:
+        """检查 tab 是否仍可用：websocket 正常且页面已加载完成"""
+        if not self.session or self.session.closed:
+            return False
+        try:
+            state = await asyncio.wait_for(self.evaluate_js('document.readyState'), timeout)
+            return state in ('interactive', 'complete')
+        except Exception as e:
+            logger.warning(f'tab健康检查失败: {e}')
+            return False
+
+    async def js_heap_size(self) -> int:
+        """当前页面的 JS 堆使用量（字节），来自 Performance.getMetrics"""
+        result = await self._send_message("Performance.getMetrics")
+        for metric in result.get('result', {}).get('metrics', []):
+            if metric.get('name') == 'JSHeapUsedSize':
+                return int(metric.get('value', 0))
+        return 0
+
+    async def _send_message(self, method: str, params: Optional[Dict] = None) -> Dict:
+        """发送消息到 Chrome DevTools Protocol"""
+        return await self.session.send(method, params)
 
     async def navigate(self, url: str):
         """导航到指定URL"""
-        await self._send_message("Page.navigate", {"url": url})
-        # 等待页面加载完成
-        while True:
-            resp = await self.ws.recv()
-            data = json.loads(resp)
-            if data.get('method') == 'Page.loadEventFired':
-                logger.debug('页面加载完成')
-                break
+        with metrics.timer('grok_navigate'):
+            # 先订阅再导航，避免错过加载事件
+            loaded = self.session.expect('Page.loadEventFired')
+            try:
+                await self._send_message("Page.navigate", {"url": url})
+                await loaded
+            finally:
+                loaded.cancel()
+            logger.debug('页面加载完成')
 
     async def evaluate_js(self, expression: str) -> Any:
         """执行JavaScript并返回结果"""
@@ -65,177 +184,798 @@ class GrokClient:
 
     async def toggle_deepsearch(self, enable: bool) -> bool:
         """切换DeepSearch功能"""
+        start = time.perf_counter()
+        ok = await self._toggle_deepsearch(enable)
+        metrics.observe('grok_toggle', time.perf_counter() - start, ok)
+        return ok
+
+    async def wait_for_element(self, name: str, timeout: float = 10, attr: Optional[str] = None,
+                               value: Optional[str] = None) -> Optional[Dict]:
+        """等待 GROK_SELECTORS[name] 对应的元素出现（且 attr 等于 value）
+
+        页面内用 MutationObserver 监听 DOM 变化，条件满足时立即返回 {'found': True, 'ariaPressed': ...}，
+        超时返回 None。整个等待只有一次 Runtime.evaluate 往返。
+        """
+        expression = wait_for_element_js(name, int(timeout * 1000), attr, value)
+        result = await self.session.send("Runtime.evaluate", {
+            "expression": expression, "awaitPromise": True, "returnByValue": True,
+        }, timeout=timeout + 5)
+        return result.get('result', {}).get('result', {}).get('value')
+
+    async def _toggle_deepsearch(self, enable: bool) -> bool:
         logger.debug(f'切换DeepSearch: enable={enable}')
+        target = 'true' if enable else 'false'
 
-        js_get_btn = '''
-            (() => {
-                try {
-                    let btn = Array.from(document.querySelectorAll('button'))
-                        .find(b => b.getAttribute('aria-label') === 'DeepSearch');
-                    if (!btn) return JSON.stringify({found: false});
-                    return JSON.stringify({
-                        found: true,
-                        ariaPressed: btn.getAttribute('aria-pressed'),
-                        outerHTML: btn.outerHTML
-                    });
-                } catch (e) {
-                    return JSON.stringify({error: e.message});
-                }
-            })()
-        '''
-
-        # 查找并切换按钮状态
-        for _ in range(5):
-            btn_info = await self.evaluate_js(js_get_btn)
-            try:
-                btn_info = json.loads(btn_info) if btn_info else {}
-            except json.JSONDecodeError:
-                logger.error(f"按钮信息解析失败: {btn_info}")
-                continue
-
-            if btn_info.get('found'):
-                current = btn_info.get('ariaPressed')
-                target = 'true' if enable else 'false'
-                if current == target:
-                    return True
-
-                # 点击按钮
-                js_click = '''
-                    (() => {
-                        let btn = Array.from(document.querySelectorAll('button'))
-                            .find(b => b.getAttribute('aria-label') === 'DeepSearch');
-                        if (!btn) return 'notfound';
-                        btn.click();
-                        return 'clicked';
-                    })()
-                '''
-                await self.evaluate_js(js_click)
-
-                # 验证状态是否更新
-                btn_info = await self.evaluate_js(js_get_btn)
-                try:
-                    btn_info = json.loads(btn_info) if btn_info else {}
-                    if btn_info.get('ariaPressed') == target:
-                        logger.debug('DeepSearch切换成功')
-                        return True
-                except json.JSONDecodeError:
-                    continue
-
-            logger.warning('未找到DeepSearch按钮，重试中...')
-            await asyncio.sleep(0.5)
+        btn_info = await self.wait_for_element('deepsearch', timeout=10)
+        if not btn_info:
+            logger.error('未找到DeepSearch按钮，DeepSearch切换失败')
+            return False
+        if btn_info.get('ariaPressed') == target:
+            return True
 
+        # 点击按钮并等待状态更新
+        await self.evaluate_js(element_js('deepsearch', "if(!el)return 'notfound';el.click();return 'clicked';"))
+        btn_info = await self.wait_for_element('deepsearch', timeout=5, attr='aria-pressed', value=target)
+        if btn_info and btn_info.get('ariaPressed') == target:
+            logger.debug('DeepSearch切换成功')
+            return True
         logger.error('DeepSearch切换失败')
         return False
 
-    async def ask_grok(self, question: str, deepsearch: bool = True) -> Optional[str]:
-        """向Grok提问并获取回答"""
-        logger.debug(f'提问: {question}, deepsearch={deepsearch}')
-
-        # 启用DeepSearch
+    async def _prepare_question(self, question: str, deepsearch: bool) -> bool:
+        """按需启用DeepSearch并填入问题，textarea 长时间未出现时返回 False"""
+        # 启用DeepSearch；复用的 tab 可能保留上一个问题的开关状态，普通提问时需要关闭
         if deepsearch:
             if not await self.toggle_deepsearch(True):
                 raise RuntimeError('DeepSearch启用失败')
+        elif not await self.toggle_deepsearch(False):
+            logger.warning('DeepSearch关闭失败，继续提问')
 
-        # 输入问题前等待 textarea 出现
-        js_check_textarea = f'''
-            (() => {{
-                let params = {{tag: 'textarea'}};
-                let result = {FIND_ELEMENT_JS}(params);
-                return result.length > 0 ? 'found' : 'notfound';
-            }})()
-        '''
-        for _ in range(20):  # 最多等10秒
-            textarea_status = await self.evaluate_js(js_check_textarea)
-            if textarea_status == 'found':
-                logger.debug('已检测到textarea')
-                break
-            logger.warning('未检测到textarea，重试中...')
-            await asyncio.sleep(0.5)
-        else:
+        # 输入问题前等待 textarea 出现，最多等10秒
+        if not await self.wait_for_element('textarea', timeout=10):
             logger.error('长时间未检测到textarea，放弃提问')
-            return None
+            return False
+        logger.debug('已检测到textarea')
 
         # 输入问题
-        js_set_question = f'''
-            (() => {{
-                let params = {{tag: 'textarea'}};
-                let result = {FIND_ELEMENT_JS}(params);
-                if (!result.length) return 'notfound';
-                let el = document.querySelectorAll('textarea')[0];
-                let descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value');
-                descriptor.set.call(el, {json.dumps(question)});
-                let event = new Event('input', {{ bubbles: true }});
-                el.dispatchEvent(event);
-                return 'ok';
-            }})()
-        '''
+        js_set_question = element_js('textarea', f'''
+            if (!el) return 'notfound';
+            let descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value');
+            descriptor.set.call(el, {json.dumps(question)});
+            el.dispatchEvent(new Event('input', {{ bubbles: true }}));
+            return 'ok';
+        ''')
         await self.evaluate_js(js_set_question)
+        return True
 
-        # 点击发送
-        js_click_send = f'''
-            (() => {{
-                let params = {{tag: 'button', type: 'submit'}};
-                let result = {FIND_ELEMENT_JS}(params);
-                if (!result.length) return 'notfound';
-                let btn = Array.from(document.querySelectorAll('button')).find(b => b.getAttribute('type') === 'submit');
-                btn.click();
-                return 'clicked';
-            }})()
-        '''
-        await self.evaluate_js(js_click_send)
-
-        # 捕获API响应
-        target_api = '/rest/app-chat/conversations/new'
-        target_request_id = None
+    async def _start_turn(self, follow_up: bool) -> str:
+        """返回本次提问的目标接口：追问时为当前对话的 responses 接口，否则在需要时先打开新对话"""
+        if follow_up:
+            if not self.conversation_id:
+                raise RuntimeError('当前tab没有可追问的对话')
+            return chat_api_path(self.conversation_id)
+        if self.conversation_id:
+            await self.reset()
+        return GROK_CHAT_API
+
+    def _end_turn(self, conversation_id: Optional[str]):
+        if conversation_id and conversation_id != self.conversation_id:
+            self.conversation_id = conversation_id
+            logger.debug(f'对话id: {conversation_id}')
+
+    async def ask_grok(self, question: str, deepsearch: bool = True, follow_up: bool = False) -> Optional[str]:
+        """向Grok提问并获取回答
+
+        follow_up 为 True 时在当前对话中追问（发往该对话的 responses 接口），Grok 沿用已有的上下文；
+        否则开始新对话，回答后记录其 conversation_id 供后续追问。
+        """
+        logger.debug(f'提问: {question}, deepsearch={deepsearch}, follow_up={follow_up}')
+        target_api = await self._start_turn(follow_up)
+        if not await self._prepare_question(question, deepsearch):
+            return None
+
+        # 捕获API响应：点击发送前开始监听，避免错过请求事件
+        network_events = ('Network.requestWillBeSent', 'Network.loadingFinished', 'Network.loadingFailed')
+        chat = ChatRequestFilter(target_api)
 
-        async def wait_for_api_response():
-            nonlocal target_request_id
+        async def wait_for_api_response(events: asyncio.Queue):
+            target_request_id = None
             while True:
-                resp = await self.ws.recv()
-                data = json.loads(resp)
-                if data.get('method') == 'Network.requestWillBeSent':
-                    url = data['params']['request']['url']
-                    if target_api in url:
-                        target_request_id = data['params']['requestId']
+                data = await events.get()
+                if data is None:
+                    raise ConnectionError('等待API响应时tab连接已断开')
+                method, params = data['method'], data['params']
+                if method == 'Network.requestWillBeSent':
+                    url = params['request']['url']
+                    if chat.api in url:
+                        target_request_id = chat.request_id = params['requestId']
                         logger.debug(f'捕获到目标API请求: {url}, requestId={target_request_id}')
-                if data.get('method') == 'Network.loadingFinished' and target_request_id:
-                    if data['params']['requestId'] == target_request_id:
-                        result = await self._send_message("Network.getResponseBody",
-                                                        {"requestId": target_request_id})
-                        return result.get('result', {}).get('body')
+                elif target_request_id and params['requestId'] == target_request_id:
+                    if method == 'Network.loadingFailed':
+                        logger.error(f"目标API请求失败: {params.get('errorText')}")
+                        return None
+                    result = await self._send_message("Network.getResponseBody",
+                                                    {"requestId": target_request_id})
+                    return result.get('result', {}).get('body')
+
+        start = time.perf_counter()
         try:
-            return await asyncio.wait_for(wait_for_api_response(), timeout=900)
+            with self.session.listen(*network_events, raw_filters=chat.raw_filters(network_events)) as events:
+                await self.evaluate_js(JS_CLICK_SEND)
+                body = await asyncio.wait_for(wait_for_api_response(events), timeout=GROK_ANSWER_TIMEOUT)
+            metrics.observe('grok_follow_up' if follow_up else 'grok_answer', time.perf_counter() - start, bool(body))
+            if body and not follow_up:
+                self._end_turn(find_conversation_id(body))
+            return body
         except asyncio.TimeoutError:
+            metrics.observe('grok_follow_up' if follow_up else 'grok_answer', time.perf_counter() - start, False)
             logger.error('等待API响应超时（10分钟）')
             return None
 
+    async def ask_grok_stream(self, question: str, deepsearch: bool = True,
+                              follow_up: bool = False) -> AsyncIterator[Dict]:
+        """向Grok提问，边接收边解析回答
+
+        请求发出后用 Network.streamResourceContent 开启响应体推送，Network.dataReceived 携带的数据
+        交给 GrokStreamParser 逐行解析，依次产出 token/artifact/message 等事件（见 GrokStreamParser），
+        最后产出 {'type': 'done', 'raw': 原始响应}。浏览器不支持推送时退回到加载完成后一次性读取响应体。
+        follow_up 同 ask_grok。
+        """
+        logger.debug(f'流式提问: {question}, deepsearch={deepsearch}, follow_up={follow_up}')
+        target_api = await self._start_turn(follow_up)
+        if not await self._prepare_question(question, deepsearch):
+            raise RuntimeError('长时间未检测到textarea，放弃提问')
+
+        parser = GrokStreamParser()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        chat = ChatRequestFilter(target_api)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        deadline = loop.time() + GROK_ANSWER_TIMEOUT
+        first_artifact = True
+        target_request_id = None
+        streaming = False
+        ok = False
+
+        def feed(data: str, base64_encoded: bool = True) -> List[Dict]:
+            nonlocal first_artifact
+            text = decoder.decode(base64.b64decode(data)) if base64_encoded else data
+            events = parser.feed(text)
+            for event in events:
+                if event['type'] == 'conversation' and not follow_up:
+                    self._end_turn(event['conversation_id'])
+            if first_artifact and any(e['type'] == 'artifact' for e in events):
+                first_artifact = False
+                metrics.observe('grok_first_artifact', time.perf_counter() - start)
+            return events
+
+        try:
+            with self.session.listen(*chat.METHODS, raw_filters=chat.raw_filters(chat.METHODS)) as queue:
+                await self.evaluate_js(JS_CLICK_SEND)
+                while True:
+                    try:
+                        data = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        raise TimeoutError('等待API响应超时（10分钟）')
+                    if data is None:
+                        raise ConnectionError('等待API响应时tab连接已断开')
+                    method, params = data['method'], data['params']
+                    if method == 'Network.requestWillBeSent':
+                        if target_request_id is None and chat.api in params['request']['url']:
+                            target_request_id = chat.request_id = params['requestId']
+                            result = await self._send_message("Network.streamResourceContent",
+                                                              {"requestId": target_request_id})
+                            if 'error' in result:
+                                logger.warning(f"浏览器不支持流式读取响应，等待加载完成: {result['error']}")
+                                continue
+                            streaming = True
+                            buffered = result.get('result', {}).get('bufferedData')
+                            if buffered:
+                                for event in feed(buffered):
+                                    yield event
+                        continue
+                    if params.get('requestId') != target_request_id:
+                        continue
+                    if method == 'Network.dataReceived':
+                        if streaming and params.get('data'):
+                            for event in feed(params['data']):
+                                yield event
+                    elif method == 'Network.loadingFailed':
+                        raise RuntimeError(f"目标API请求失败: {params.get('errorText')}")
+                    else:
+                        if not streaming:
+                            result = (await self._send_message("Network.getResponseBody",
+                                                               {"requestId": target_request_id})).get('result', {})
+                            for event in feed(result.get('body') or '', result.get('base64Encoded', False)):
+                                yield event
+                        tail = decoder.decode(b'', final=True)
+                        for event in (parser.feed(tail) if tail else []) + parser.close():
+                            yield event
+                        ok = True
+                        yield {'type': 'done', 'raw': parser.raw}
+                        return
+        finally:
+            metrics.observe('grok_follow_up' if follow_up else 'grok_answer', time.perf_counter() - start, ok)
+
+class GrokTabPool:
+    """预热的 Grok tab 池
+
+    tab 在放回池中后立即在后台打开新的私密对话，下一个问题拿到的是已加载完成的页面；
+    取出时做健康检查，使用 max_uses 次或 JS 堆超过 max_heap_mb 后关闭并换新 tab。
+    使用托管浏览器（BROWSER_MANAGED）时，每次回收 tab 后检查浏览器内存，超过上限时暂停取 tab，
+    等进行中的提问结束后重启浏览器。
+
+    Args:
+        size: 最多同时打开的 tab 数，默认读取 GROK_TAB_POOL_SIZE。两者都未设置时为默认大小：
+            取 DAILY_CONCURRENCY（可由 set_concurrency 调大），启用软超时（GROK_SOFT_DEADLINE
+            或 enable_hedging）时翻倍
+        max_uses: 单个 tab 最多回答的问题数，默认读取 GROK_TAB_MAX_USES
+        max_heap_mb: JS 堆上限（MB），默认读取 GROK_TAB_MAX_HEAP_MB
+        endpoint: Chrome 远程调试地址，默认读取 CDP_ENDPOINT
+    """
+    def __init__(self, size: Optional[int] = None, max_uses: Optional[int] = None,
+                 max_heap_mb: Optional[float] = None, endpoint: Optional[str] = None):
+        self.endpoint = endpoint
+        if size is None:
+            size = int(os.getenv('GROK_TAB_POOL_SIZE') or 0)
+        # 显式指定的大小不再自动调整
+        self.fixed_size = bool(size)
+        self.concurrency = int(os.getenv('DAILY_CONCURRENCY') or 1)
+        self.hedging = grok_soft_deadline() > 0
+        self.size = max(1, size) if size else self._default_size()
+        self.max_uses = max_uses or int(os.getenv('GROK_TAB_MAX_USES', '20'))
+        self.max_heap_mb = max_heap_mb or float(os.getenv('GROK_TAB_MAX_HEAP_MB', '512'))
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._all = set()
+        self._background = set()
+        # 等待重启浏览器期间不再取出 tab
+        self._restarting: Optional[asyncio.Future] = None
+
+    def _default_size(self) -> int:
+        # 每个深度搜索都可能追加一个普通提问，需要留出同样多的 tab
+        return max(1, self.concurrency) * (2 if self.hedging else 1)
+
+    def _grow(self):
+        if self.fixed_size:
+            return
+        size = self._default_size()
+        if size > self.size:
+            if self._slots is not None:
+                for _ in range(size - self.size):
+                    self._slots.release()
+            logger.info(f'[GrokTabPool] tab 上限 {self.size} -> {size}')
+            self.size = size
+
+    def set_concurrency(self, concurrency: int):
+        """按同时提问的数量调大默认大小（只增不减，需在事件循环内调用）"""
+        if concurrency > self.concurrency:
+            self.concurrency = concurrency
+            self._grow()
+
+    def enable_hedging(self):
+        """为软超时追加的普通提问留出 tab：默认大小翻倍（需在事件循环内调用）"""
+        if not self.hedging:
+            self.hedging = True
+            self._grow()
+
+    def _init(self):
+        # asyncio 对象需在事件循环内创建
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _open_tab(self) -> GrokClient:
+        client = GrokClient(self.endpoint)
+        try:
+            await client.open()
+            await client.reset()
+        except BaseException:
+            await client.close()
+            raise
+        return client
+
+    async def _new_tab(self) -> GrokClient:
+        try:
+            client = await self._open_tab()
+        except Exception as e:
+            if not browser_manager_enabled():
+                raise
+            # 托管的浏览器可能已经退出：拉起后重试一次
+            logger.warning(f'[GrokTabPool] 新建tab失败，检查浏览器: {e}')
+            await asyncio.to_thread(get_browser_manager().ensure_running, self.endpoint, False)
+            client = await self._open_tab()
+        self._all.add(client)
+        metrics.incr('grok_tab_opened')
+        return client
+
+    async def _discard(self, client: GrokClient):
+        self._all.discard(client)
+        await client.close()
+        metrics.incr('grok_tab_recycled')
+
+    def _in_flight(self) -> int:
+        # 已取出或正在后台重置的 tab
+        return len(self._all) - self._idle.qsize()
+
+    async def _check_browser(self):
+        if self._restarting is not None:
+            return
+        manager = get_browser_manager()
+        if not await asyncio.to_thread(manager.needs_restart, self.endpoint):
+            return
+        self._restarting = asyncio.get_running_loop().create_future()
+        try:
+            logger.info(f'[GrokTabPool] 浏览器内存超过上限，等待 {self._in_flight()} 个进行中的tab结束后重启')
+            while self._in_flight() > 0:
+                await asyncio.sleep(0.5)
+            # 重启后池中的空闲 tab 已失效，下次取出时由健康检查回收
+            await asyncio.to_thread(manager.ensure_running, self.endpoint)
+        except Exception as e:
+            logger.warning(f'[GrokTabPool] 重启浏览器失败: {e}')
+        finally:
+            restarting, self._restarting = self._restarting, None
+            restarting.set_result(None)
+
+    async def _warm_one(self, count: int):
+        # 预热同样占用名额，避免和 acquire 同时新建导致 tab 数超过 size
+        async with self._slots:
+            if len(self._all) >= count:
+                return
+            self._idle.put_nowait(await self._new_tab())
+
+    async def warm(self, count: Optional[int] = None):
+        """提前打开并加载 tab，直到池中共有 count 个（不超过 size）"""
+        self._init()
+        count = min(count or self.size, self.size)
+        results = await asyncio.gather(*(self._warm_one(count) for _ in range(count - len(self._all))),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f'[GrokTabPool] 预热tab失败: {result}')
+        logger.info(f'[GrokTabPool] 已预热，共 {len(self._all)} 个tab')
+
+    async def acquire(self) -> GrokClient:
+        """取出一个健康的 tab，没有空闲 tab 时新建，达到 size 上限或正在重启浏览器时等待"""
+        self._init()
+        while True:
+            while self._restarting is not None:
+                await asyncio.shield(self._restarting)
+            await self._slots.acquire()
+            if self._restarting is None:
+                break
+            # 等待名额期间开始了重启，先让出名额
+            self._slots.release()
+        try:
+            while not self._idle.empty():
+                client = self._idle.get_nowait()
+                if await client.health_check():
+                    metrics.incr('grok_tab_reused')
+                    return client
+                await self._discard(client)
+            return await self._new_tab()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, client: GrokClient, reusable: bool = True):
+        """归还 tab：不可复用、用满次数或内存过大时关闭，否则在后台重置后放回池中"""
+        client.uses += 1
+        try:
+            if reusable and client.uses < self.max_uses:
+                heap_mb = await client.js_heap_size() / 1024 / 1024
+                if heap_mb > self.max_heap_mb:
+                    logger.info(f'[GrokTabPool] tab JS堆 {heap_mb:.0f}MB 超过上限，回收')
+                    reusable = False
+            else:
+                reusable = False
+        except Exception as e:
+            logger.warning(f'[GrokTabPool] 读取tab内存失败，回收: {e}')
+            reusable = False
+
+        if not reusable:
+            await self._discard(client)
+            self._slots.release()
+            if browser_manager_enabled():
+                task = asyncio.ensure_future(self._check_browser())
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return
+
+        async def reset_and_return():
+            try:
+                await client.reset()
+                self._idle.put_nowait(client)
+            except Exception as e:
+                logger.warning(f'[GrokTabPool] 重置tab失败，回收: {e}')
+                await self._discard(client)
+            finally:
+                self._slots.release()
+
+        task = asyncio.ensure_future(reset_and_return())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @asynccontextmanager
+    async def tab(self):
+        """取出 tab，正常结束后复用，出错或被取消时回收"""
+        client = await self.acquire()
+        reusable = False
+        try:
+            yield client
+            reusable = True
+        finally:
+            await self.release(client, reusable)
+
+    async def close(self):
+        """关闭池中所有 tab"""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        clients, self._all = list(self._all), set()
+        for client in clients:
+            await client.close()
+        self._idle = None
+        self._slots = None
+
+class GrokTabCluster:
+    """跨多个浏览器（CDP 地址）的 tab 池
+
+    每个地址一个 GrokTabPool，tab 上限来自 CDP_ENDPOINTS 中的 =N（默认同 GrokTabPool）。
+    所有提问按到达顺序排队（FIFO），有空位时分给当前负载比例最低的浏览器，
+    先来的问题不会被后提交的批量请求插队。
+    """
+    def __init__(self, endpoints: Optional[List[Tuple[str, Optional[int]]]] = None):
+        if endpoints is None:
+            endpoints = get_cdp_endpoints()
+        self.pools = [GrokTabPool(size=cap, endpoint=url) for url, cap in endpoints]
+        self._in_use = {pool: 0 for pool in self.pools}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def size(self) -> int:
+        return sum(pool.size for pool in self.pools)
+
+    def _free_pool(self) -> Optional[GrokTabPool]:
+        free = [pool for pool in self.pools if self._in_use[pool] < pool.size]
+        if not free:
+            return None
+        return min(free, key=lambda pool: self._in_use[pool] / pool.size)
+
+    async def _reserve(self) -> GrokTabPool:
+        pool = None if self._waiters else self._free_pool()
+        if pool is not None:
+            self._in_use[pool] += 1
+            return pool
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            pool = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已经转交过来，归还给下一个等待者
+                self._unreserve(waiter.result())
+            else:
+                waiter.cancel()
+            raise
+        metrics.observe('grok_queue_wait', time.perf_counter() - start)
+        return pool
+
+    def _unreserve(self, pool: GrokTabPool):
+        # 空出的名额直接转交给最早的等待者
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(pool)
+                return
+        self._in_use[pool] -= 1
+
+    def _dispatch(self):
+        # tab 上限调大后，新的名额按顺序分给等待者
+        while self._waiters:
+            pool = self._free_pool()
+            if pool is None:
+                return
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_use[pool] += 1
+                waiter.set_result(pool)
+
+    def set_concurrency(self, concurrency: int):
+        """让每个浏览器的默认 tab 上限至少为 concurrency（CDP_ENDPOINTS 中 =N 指定的上限不变）"""
+        for pool in self.pools:
+            pool.set_concurrency(concurrency)
+        self._dispatch()
+
+    def enable_hedging(self):
+        """软超时生效时调用，见 GrokTabPool.enable_hedging"""
+        for pool in self.pools:
+            pool.enable_hedging()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def tab(self):
+        """排队取出一个 tab，用法同 GrokTabPool.tab"""
+        pool = await self._reserve()
+        try:
+            async with pool.tab() as client:
+                yield client
+        finally:
+            self._unreserve(pool)
+
+    async def warm(self, count: Optional[int] = None, concurrency: Optional[int] = None):
+        """按各浏览器的上限依次分配，共预热 count 个 tab；concurrency 见 set_concurrency"""
+        if concurrency:
+            self.set_concurrency(concurrency)
+        remaining = min(count or self.size, self.size)
+        jobs = []
+        for pool in self.pools:
+            if remaining <= 0:
+                break
+            jobs.append(pool.warm(min(pool.size, remaining)))
+            remaining -= pool.size
+        await asyncio.gather(*jobs)
+
+    async def close(self):
+        await asyncio.gather(*(pool.close() for pool in self.pools), return_exceptions=True)
+
+_tab_pool: Optional[GrokTabCluster] = None
+
+def get_tab_pool() -> GrokTabCluster:
+    """进程内共享的 tab 池，运行在 utils.aio 的后台事件循环上"""
+    global _tab_pool
+    if _tab_pool is None:
+        _tab_pool = GrokTabCluster()
+    return _tab_pool
+
+def warm_tab_pool(count: Optional[int] = None, concurrency: Optional[int] = None):
+    """在后台预热 tab 池，不阻塞调用方
+
+    Args:
+        count: 预热的 tab 数
+        concurrency: 同时提问的数量，tab 池的默认上限会调大到该值
+    """
+    return submit(get_tab_pool().warm(count, concurrency))
+
+def close_tab_pool():
+    """关闭 tab 池中的所有 tab，下次提问时重新创建"""
+    global _tab_pool
+    if _tab_pool is not None:
+        pool, _tab_pool = _tab_pool, None
+        run_sync(pool.close())
+
 async def grok_ask_api_async(question: str, deepsearch: bool = True) -> Optional[str]:
-    """异步API：向Grok提问"""
-    async with GrokClient() as client:
-        await client.navigate("https://grok.com/chat#private")
+    """异步API：向Grok提问，使用 tab 池中预热好的 tab"""
+    async with get_tab_pool().tab() as client:
         return await client.ask_grok(question, deepsearch)
 
+async def grok_stream_api_async(question: str, deepsearch: bool = True) -> AsyncIterator[Dict]:
+    """异步流式API：向Grok提问，逐个产出回答事件（见 GrokClient.ask_grok_stream）"""
+    async with get_tab_pool().tab() as client:
+        async for event in client.ask_grok_stream(question, deepsearch):
+            yield event
+
+def grok_stream_api(question: str, deepsearch: bool = True) -> Iterator[Dict]:
+    """同步流式API：可在任意线程中迭代，回答在后台事件循环上接收"""
+    return iterate_sync(grok_stream_api_async(question, deepsearch))
+
+class GrokConversation:
+    """占用一个 tab 的多轮对话：第一次提问开始新对话，之后的提问都是同一对话中的追问
+
+    追问（例如“展开第三部分”“列出来源”）发往该对话的 responses 接口，沿用 Grok 已有的研究上下文，
+    不需要新 tab，也不需要重新深度搜索。退出时 tab 归还给池并重置为新对话，出错时回收。
+    可以用 async with（异步），也可以用 with（同步，提问在 utils.aio 的后台事件循环上执行）：
+
+        with GrokConversation() as conv:
+            report = extract_artifact(conv.ask(question))
+            sources = extract_artifact(conv.ask('列出以上报告引用的所有来源'))
+    """
+    def __init__(self, pool: Optional[GrokTabCluster] = None):
+        self._pool = pool
+        self._tab = None
+        self.client: Optional[GrokClient] = None
+        self.turns = 0
+
+    @property
+    def conversation_id(self) -> Optional[str]:
+        return self.client.conversation_id if self.client else None
+
+    async def __aenter__(self):
+        self._tab = (self._pool or get_tab_pool()).tab()
+        self.client = await self._tab.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        tab, self._tab, self.client = self._tab, None, None
+        return await tab.__aexit__(exc_type, exc_val, exc_tb)
+
+    def __enter__(self):
+        return run_sync(self.__aenter__())
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return run_sync(self.__aexit__(exc_type, exc_val, exc_tb))
+
+    def _next_turn(self, deepsearch: Optional[bool]) -> Tuple[bool, bool]:
+        if self.client is None:
+            raise RuntimeError('GrokConversation 未打开')
+        follow_up = self.turns > 0
+        self.turns += 1
+        return (not follow_up if deepsearch is None else deepsearch), follow_up
+
+    async def ask_async(self, question: str, deepsearch: Optional[bool] = None) -> Optional[str]:
+        """提问并返回原始响应；deepsearch 默认第一次提问开启、追问关闭
+
+        第一次提问没有得到对话 id（例如请求失败）时，追问会抛出 RuntimeError。
+        """
+        deepsearch, follow_up = self._next_turn(deepsearch)
+        return await self.client.ask_grok(question, deepsearch, follow_up=follow_up)
+
+    async def stream_async(self, question: str, deepsearch: Optional[bool] = None) -> AsyncIterator[Dict]:
+        """同 ask_async，逐个产出回答事件（见 GrokClient.ask_grok_stream）"""
+        deepsearch, follow_up = self._next_turn(deepsearch)
+        async for event in self.client.ask_grok_stream(question, deepsearch, follow_up=follow_up):
+            yield event
+
+    def ask(self, question: str, deepsearch: Optional[bool] = None) -> Optional[str]:
+        """同步版 ask_async"""
+        return run_sync(self.ask_async(question, deepsearch))
+
+    def stream(self, question: str, deepsearch: Optional[bool] = None) -> Iterator[Dict]:
+        """同步版 stream_async"""
+        return iterate_sync(self.stream_async(question, deepsearch))
+
+async def grok_batch_api_async(questions: List[str], deepsearch: bool = True) -> AsyncIterator[Tuple[int, Optional[str], Optional[BaseException]]]:
+    """批量提问，问题分散到所有浏览器的 tab 上并发执行
+
+    按完成顺序产出 (问题序号, 原始响应, 异常)；单个问题失败不影响其他问题。
+    并发数由 tab 池的总上限控制，多个批量请求同时提交时按先来后到排队。
+    """
+    async def ask(idx: int, question: str):
+        try:
+            return idx, await grok_ask_api_async(question, deepsearch), None
+        except Exception as e:
+            logger.error(f'第{idx+1}个问题失败: {e}')
+            return idx, None, e
+
+    tasks = [asyncio.ensure_future(ask(idx, question)) for idx, question in enumerate(questions)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def grok_batch_api(questions: List[str], deepsearch: bool = True) -> Iterator[Tuple[int, Optional[str], Optional[BaseException]]]:
+    """同步批量API：按完成顺序迭代 (问题序号, 原始响应, 异常)"""
+    return iterate_sync(grok_batch_api_async(questions, deepsearch))
+
 def grok_ask_api(question: str, deepsearch: bool = True) -> Optional[str]:
     """同步API：向Grok提问"""
     logger.debug(f'grok_ask_api 入参: question={question}, deepsearch={deepsearch}')
-    result = asyncio.run(grok_ask_api_async(question, deepsearch))
+    result = run_sync(grok_ask_api_async(question, deepsearch))
     logger.debug(f'grok_ask_api 出参: {result[:200] if result else result}')
     return result
 
-import re
-
-def call_grok_api(todo_content,deepsearch=False):
-    raw_response = grok_ask_api(todo_content, deepsearch)
-    if raw_response:
-        parsed_result = parse_grok_result(raw_response)
-        if parsed_result:
-            # 提取 <xaiArtifact ...>...</xaiArtifact> 之间的内容，支持多组
-            pattern = r'<xaiArtifact[^>]*>(.*?)</xaiArtifact>'
-            matches = re.findall(pattern, parsed_result, flags=re.DOTALL)
-            if matches:
-                return "\n".join(matches)
-            else:
-                return parsed_result
-    return None
+def extract_artifact(raw_response):
+    """解析 Grok 原始响应，优先返回 <xaiArtifact> 中的内容（支持多组），否则返回完整回答"""
+    return extract_artifact_text(raw_response)
+
+async def grok_hedged_ask_async(question: str, soft_deadline: float) -> Tuple[Optional[str], bool]:
+    """深度搜索超过 soft_deadline 秒仍未完成（或已失败）时，在另一个 tab 同时发起普通提问
+
+    两者中先得到可用报告的一方胜出，另一方被取消（其 tab 会被回收）。
+    返回 (原始响应, 是否来自深度搜索)；两者都失败时返回 (None, True)。
+    """
+    def usable(task: asyncio.Task) -> bool:
+        return not task.cancelled() and task.exception() is None and bool(extract_artifact(task.result()))
+
+    # 显式传入 soft_deadline 时环境变量可能未设置，tab 池需要为追加的普通提问留出名额，
+    # 否则普通提问会排在它要绕开的深度搜索后面
+    get_tab_pool().enable_hedging()
+    start = time.perf_counter()
+    deep = asyncio.ensure_future(grok_ask_api_async(question, True))
+    tasks = {deep: True}
+    try:
+        await asyncio.wait({deep}, timeout=soft_deadline)
+        if deep.done() and usable(deep):
+            return deep.result(), True
+
+        reason = '失败' if deep.done() else f'超过 {soft_deadline:.0f} 秒未完成'
+        logger.warning(f'[Grok] 深度搜索{reason}，同时发起普通提问')
+        metrics.incr('grok_hedge_started')
+        quick = asyncio.ensure_future(grok_ask_api_async(question, False))
+        tasks[quick] = False
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if usable(task):
+                    is_deep = tasks[task]
+                    metrics.incr('grok_hedge_deep_won' if is_deep else 'grok_hedge_quick_won')
+                    logger.info(f"[Grok] 采用{'深度搜索' if is_deep else '普通提问'}的回答，"
+                                f"耗时 {time.perf_counter() - start:.0f} 秒")
+                    return task.result(), is_deep
+        logger.error('[Grok] 深度搜索和普通提问均未得到可用回答')
+        return None, True
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def grok_soft_deadline() -> float:
+    """深度搜索的软超时（秒），读取 GROK_SOFT_DEADLINE，未设置或为 0 时不启用"""
+    return float(os.getenv('GROK_SOFT_DEADLINE') or 0)
+
+def grok_stream_enabled() -> bool:
+    return env_flag('GROK_STREAM')
+
+def _replay_events(raw_response: Optional[str], on_event: Callable[[Dict], None]):
+    # 缓存命中时按流式事件重放一遍，调用方不需要区分结果来源
+    if not raw_response:
+        return
+    parser = GrokStreamParser()
+    for event in parser.feed(raw_response) + parser.close():
+        on_event(event)
+
+def call_grok_api(todo_content,deepsearch=False,return_raw=False,
+                  stream: Optional[bool] = None, on_event: Optional[Callable[[Dict], None]] = None,
+                  bypass_cache: Optional[bool] = None, soft_deadline: Optional[float] = None):
+    """向Grok提问并提取报告内容
+
+    相同的问题（规范化后的 prompt + deepsearch）优先使用本地缓存（见 utils.grok_cache），
+    同时进行的相同问题只会调用一次 Grok。
+
+    Args:
+        return_raw: 为 True 时返回 (原始响应, 提取结果)，便于调用方保存原始响应
+        stream: 是否边接收边解析回答，默认读取环境变量 GROK_STREAM
+        on_event: 流式模式下每个回答事件（token/artifact 片段等）的回调，可用于提前处理报告；
+            没有完整的 artifact 时片段与返回的报告不同（见 GrokStreamParser），应以返回值为准
+        bypass_cache: 为 True 时不读取缓存（仍会写入新结果），默认读取环境变量 GROK_CACHE_BYPASS
+        soft_deadline: 深度搜索的软超时（秒），超时后同时发起普通提问并采用先完成的可用回答
+            （见 grok_hedged_ask_async），默认读取环境变量 GROK_SOFT_DEADLINE；此模式下不使用流式接收
+    """
+    if stream is None:
+        stream = grok_stream_enabled() or on_event is not None
+    if bypass_cache is None:
+        bypass_cache = cache_bypassed()
+    if soft_deadline is None:
+        soft_deadline = grok_soft_deadline()
+    cache = get_answer_cache()
+
+    def ask():
+        if deepsearch and soft_deadline > 0:
+            start = time.perf_counter()
+            raw_response, is_deep = run_sync(grok_hedged_ask_async(todo_content, soft_deadline))
+            metrics.observe('grok_hedged_answer', time.perf_counter() - start, raw_response is not None)
+            artifact = extract_artifact(raw_response)
+            if not is_deep and artifact and cache.enabled:
+                # 普通提问的回答按普通提问缓存，不能当作深度搜索的结果
+                cache.put(cache_key(todo_content, False), raw_response, artifact)
+            return raw_response, artifact, is_deep
+        if stream:
+            raw_response = None
+            for event in grok_stream_api(todo_content, deepsearch):
+                if event['type'] == 'done':
+                    raw_response = event['raw']
+                elif on_event:
+                    on_event(event)
+        else:
+            raw_response = grok_ask_api(todo_content, deepsearch)
+        return raw_response, extract_artifact(raw_response), True
+
+    if cache.enabled:
+        raw_response, artifact, cached = cache.get_or_compute(todo_content, deepsearch, ask, bypass=bypass_cache)
+        if cached and on_event:
+            _replay_events(raw_response, on_event)
+    else:
+        raw_response, artifact, _ = ask()
+    if return_raw:
+        return raw_response, artifact
+    return artifact
 
-__all__ = ['GrokClient', 'grok_ask_api', 'grok_ask_api_async']
+__all__ = ['GrokClient', 'GrokConversation', 'GrokTabPool', 'GrokTabCluster', 'get_tab_pool', 'warm_tab_pool', 'close_tab_pool',
+           'grok_ask_api', 'grok_ask_api_async', 'grok_stream_api', 'grok_stream_api_async',
+           'grok_batch_api', 'grok_batch_api_async', 'grok_hedged_ask_async',
+           'call_grok_api', 'extract_artifact']
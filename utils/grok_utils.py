@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -32,19 +32,48 @@ FIND_ELEMENT_JS = """
     }).filter(x=>x);
 })"""
 
-def parse_grok_result(response: str) -> str:
-    """
-    解析grok返回的多行JSON字符串，提取所有modelResponse.message内容，拼接成完整答案。
-    
-    Args:
-        response: Grok API返回的响应字符串
-        
-    Returns:
-        {"messages": [msg1, msg2, ...], "full_message": "..."}，如果解析失败则返回None
+MODEL_RESPONSE_KEY = '"modelResponse"'
+CONVERSATION_KEY = '"conversationId"'
+
+# grok.com 页面元素的 CSS 选择器
+GROK_SELECTORS = {
+    'deepsearch': 'button[aria-label="DeepSearch"]',
+    'textarea': 'textarea',
+    'submit': 'button[type="submit"]',
+}
+
+# 元素引用缓存在 window.__grokEls 中，元素仍在文档内时直接复用，不再遍历页面节点
+LOOKUP_ELEMENT_JS = ("const $el=(k,s)=>{const c=window.__grokEls=window.__grokEls||{};"
+                     "let e=c[k];if(!e||!e.isConnected)e=c[k]=document.querySelector(s);return e;};")
+
+def element_js(name: str, body: str) -> str:
+    """生成查找 GROK_SELECTORS[name] 后执行 body 的脚本，body 中用 el 引用元素（可能为 null）"""
+    selector = json.dumps(GROK_SELECTORS[name])
+    return f"(() => {{{LOOKUP_ELEMENT_JS}const el=$el({json.dumps(name)},{selector});{body}}})()"
+
+def wait_for_element_js(name: str, timeout_ms: int, attr: str = None, value: str = None) -> str:
+    """生成等待元素出现（且 attr 等于 value）的 Promise 脚本，需配合 awaitPromise 执行
+
+    页面变化由 MutationObserver 通知，条件满足时立即 resolve
+    {found: true, ariaPressed}，超时 resolve null。
     """
-    if not response:
-        return None
-    
+    check = f"el&&el.getAttribute({json.dumps(attr)})==={json.dumps(value)}" if attr else "el"
+    body = (
+        "const find=()=>{const el=$el(%s,%s);return %s?el:null;};"
+        "const info=el=>({found:true,ariaPressed:el.getAttribute('aria-pressed')});"
+        "return new Promise(resolve=>{"
+        "let el=find();if(el)return resolve(info(el));"
+        "const done=v=>{obs.disconnect();clearTimeout(t);resolve(v);};"
+        "const obs=new MutationObserver(()=>{const el=find();if(el)done(info(el));});"
+        "obs.observe(document.documentElement,{childList:true,subtree:true%s});"
+        "const t=setTimeout(()=>done(null),%d);"
+        "});"
+    ) % (json.dumps(name), json.dumps(GROK_SELECTORS[name]), check,
+           f",attributeFilter:[{json.dumps(attr)}]" if attr else '', timeout_ms)
+    return f"(() => {{{LOOKUP_ELEMENT_JS}{body}}})()"
+
+def response_error(response: str) -> Optional[Dict[str, str]]:
+    """识别错误字符串和区域不可用提示，返回 {'error': ...}，正常响应返回 None"""
     # 1. 错误字符串处理
     if isinstance(response, str) and response.startswith('Error:'):
         error_data = handle_str_error(response)
@@ -54,18 +83,102 @@ def parse_grok_result(response: str) -> str:
     # 2. 区域不可用提示
     if 'This service is not available in your region' in response:
         return {'error': 'This service is not available in your region'}
+    return None
 
-    messages = []
-    for line in response.splitlines():
+def iter_lines(text: str) -> Iterator[str]:
+    """逐行遍历文本，不像 splitlines 那样一次复制出所有行"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def iter_model_messages(response: str) -> Iterator[str]:
+    """单次遍历响应，依次产出每个 modelResponse.message
+
+    不含 "modelResponse" 的行（token、思考过程等）不做 JSON 解析；解析失败的行最后汇总记一条警告。
+    """
+    bad_lines = 0
+    for line in iter_lines(response):
+        if MODEL_RESPONSE_KEY not in line:
+            continue
         try:
             parsed = json.loads(line)
             # 提取modelResponse.message
             msg = parsed.get("result", {}).get("response", {}).get("modelResponse", {}).get("message")
-            if msg:
-                messages.append(msg)
-        except (json.JSONDecodeError, KeyError, AttributeError) as e:
-            logger.warning(f"解析JSON行时出错: {e}")
+        except (json.JSONDecodeError, KeyError, AttributeError):
+            bad_lines += 1
+            continue
+        if msg:
+            yield msg
+    if bad_lines:
+        logger.warning(f"解析JSON行时出错: {bad_lines} 行")
+
+def find_conversation_id(response: str) -> Optional[str]:
+    """返回响应中的 conversationId（/conversations/new 的第一行），没有时返回 None"""
+    if not response:
+        return None
+    for line in iter_lines(response):
+        if CONVERSATION_KEY not in line:
             continue
+        try:
+            conversation = (json.loads(line).get('result') or {}).get('conversation') or {}
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        if isinstance(conversation, dict) and conversation.get('conversationId'):
+            return conversation['conversationId']
+    return None
+
+def parse_grok_result(response: str) -> str:
+    """
+    解析grok返回的多行JSON字符串，提取所有modelResponse.message内容，拼接成完整答案。
+    
+    Args:
+        response: Grok API返回的响应字符串
+        
+    Returns:
+        拼接后的完整回答；错误响应返回 {"error": ...}；没有回答时返回None
+    """
+    if not response:
+        return None
+    error = response_error(response)
+    if error:
+        return error
+    messages = list(iter_model_messages(response))
+    if messages:
+        return "".join(messages)
+    return None
+
+def extract_artifact_text(response: str) -> Optional[str]:
+    """单次遍历响应，返回所有 <xaiArtifact> 的内容（换行连接），没有 artifact 时返回完整回答
+
+    不拼接完整回答、不对整个回答跑正则；找到第一个完整的 artifact 后不再保留回答正文。
+    """
+    if not response:
+        return None
+    error = response_error(response)
+    if error:
+        logger.error(f"Grok返回错误: {error['error'][:200]}")
+        return None
+    extractor = ArtifactStreamExtractor()
+    artifacts: List[List[str]] = []
+    messages: Optional[List[str]] = []
+    for msg in iter_model_messages(response):
+        for index, fragment in extractor.feed_parts(msg):
+            if fragment is None:
+                artifacts.append([])
+            else:
+                artifacts[index].append(fragment)
+        if messages is not None:
+            messages.append(msg)
+            if extractor.closed:
+                messages = None
+    if extractor.closed:
+        # 与正则一致：只采用有结束标签的 artifact
+        return "\n".join("".join(parts) for parts in artifacts[:extractor.closed])
     if messages:
         return "".join(messages)
     return None
@@ -82,4 +195,162 @@ def handle_str_error(error_str: str) -> Dict[str, str]:
     """
     return {"error": error_str}
 
-__all__ = ['parse_grok_result', 'FIND_ELEMENT_JS', 'handle_str_error']
+ARTIFACT_OPEN = '<xaiArtifact'
+ARTIFACT_CLOSE = '</xaiArtifact>'
+
+class ArtifactStreamExtractor:
+    """从逐段到达的回答文本中增量提取 <xaiArtifact ...>...</xaiArtifact> 的内容
+
+    标签可能被拆在两段文本之间，未确定的尾部会留到下一次 feed 再判断。
+    count 为已开始的 artifact 数，closed 为已遇到结束标签的 artifact 数。
+    """
+    def __init__(self):
+        self._buffer = ''
+        self._inside = False
+        self.count = 0
+        self.closed = 0
+
+    def feed(self, text: str) -> List[str]:
+        """输入一段回答文本，返回其中新出现的 artifact 内容片段，不同 artifact 之间插入换行"""
+        fragments = []
+        for index, fragment in self.feed_parts(text):
+            if index and fragment is None:
+                # 多个 artifact 之间与 extract_artifact 一样用换行连接
+                fragments.append('\n')
+            elif fragment is not None:
+                fragments.append(fragment)
+        return fragments
+
+    def feed_parts(self, text: str) -> List[Tuple[int, Optional[str]]]:
+        """同 feed，返回 [(artifact 序号, 片段)]；每个 artifact 开始时先返回一个 (序号, None)"""
+        self._buffer += text
+        parts = []
+        while self._buffer:
+            if not self._inside:
+                start = self._buffer.find(ARTIFACT_OPEN)
+                if start < 0:
+                    # 只保留可能是开始标签前缀的尾部
+                    self._buffer = self._buffer[-(len(ARTIFACT_OPEN) - 1):]
+                    break
+                end = self._buffer.find('>', start)
+                if end < 0:
+                    self._buffer = self._buffer[start:]
+                    break
+                self._buffer = self._buffer[end + 1:]
+                self._inside = True
+                parts.append((self.count, None))
+                self.count += 1
+            else:
+                end = self._buffer.find(ARTIFACT_CLOSE)
+                if end >= 0:
+                    if end:
+                        parts.append((self.count - 1, self._buffer[:end]))
+                    self._buffer = self._buffer[end + len(ARTIFACT_CLOSE):]
+                    self._inside = False
+                    self.closed += 1
+                    continue
+                # 结束标签可能被截断：留下最长的可能前缀
+                keep = 0
+                for size in range(min(len(ARTIFACT_CLOSE) - 1, len(self._buffer)), 0, -1):
+                    if ARTIFACT_CLOSE.startswith(self._buffer[-size:]):
+                        keep = size
+                        break
+                emit = self._buffer[:len(self._buffer) - keep]
+                if emit:
+                    parts.append((self.count - 1, emit))
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                break
+        return parts
+
+class GrokStreamParser:
+    """增量解析 Grok 的 NDJSON 响应流
+
+    feed 可以接收任意切分的文本块，只在遇到换行时解析完整的一行，返回该块中新产生的事件：
+        {'type': 'conversation', 'conversation_id': ...}
+        {'type': 'token', 'token': ..., 'thinking': bool}
+        {'type': 'artifact', 'text': ...}     artifact 内容片段，边到达边输出
+        {'type': 'message', 'message': ...}   modelResponse 中的完整回答
+        {'type': 'error', 'error': ...}
+    已接收的原始文本保存在 raw 中，可交给 parse_grok_result/extract_artifact 或写入检查点。
+
+    artifact 片段在结束标签出现之前就会输出。只有所有开始的 artifact 都有结束标签时，片段按顺序拼接
+    才等于 extract_artifact(raw)；回答中没有完整的 artifact 时（例如 '开场白 <xaiArtifact ...>未结束的内容'），
+    片段只有标签之后的部分，而 extract_artifact 返回完整回答。提前处理片段的调用方应以最终结果为准。
+    """
+    def __init__(self):
+        self._partial = ''
+        self._chunks: List[str] = []
+        self._artifacts = ArtifactStreamExtractor()
+        # 收到 modelResponse 之前根据 token 增量提取 artifact，之后以完整回答为准
+        self._messages: List[str] = []
+        self._artifact_text = ''
+
+    def _artifact_event(self, text: str) -> Dict:
+        self._artifact_text += text
+        return {'type': 'artifact', 'text': text}
+
+    @property
+    def raw(self) -> str:
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self._chunks.append(chunk)
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            events.extend(self._parse_line(line))
+        return events
+
+    def close(self) -> List[Dict]:
+        """流结束时解析最后一行（没有换行结尾）"""
+        line, self._partial = self._partial, ''
+        return self._parse_line(line)
+
+    def _parse_line(self, line: str) -> List[Dict]:
+        line = line.strip()
+        if not line:
+            return []
+        try:
+            parsed = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"解析JSON行时出错: {e}")
+            return []
+        if not isinstance(parsed, dict):
+            return []
+        if 'error' in parsed:
+            return [{'type': 'error', 'error': parsed['error']}]
+
+        result = parsed.get('result') or {}
+        events = []
+        conversation = result.get('conversation')
+        if isinstance(conversation, dict) and conversation.get('conversationId'):
+            events.append({'type': 'conversation', 'conversation_id': conversation['conversationId']})
+
+        response = result.get('response') or {}
+        token = response.get('token')
+        if token:
+            thinking = bool(response.get('isThinking'))
+            events.append({'type': 'token', 'token': token, 'thinking': thinking})
+            if not thinking and not self._messages:
+                for text in self._artifacts.feed(token):
+                    events.append(self._artifact_event(text))
+
+        message = (response.get('modelResponse') or {}).get('message')
+        if message:
+            # token 流可能不完整：补齐完整回答中尚未输出的 artifact 内容
+            self._messages.append(message)
+            full = ''.join(ArtifactStreamExtractor().feed(''.join(self._messages)))
+            if full.startswith(self._artifact_text):
+                if len(full) > len(self._artifact_text):
+                    events.append(self._artifact_event(full[len(self._artifact_text):]))
+            else:
+                logger.warning('token流中的artifact与完整回答不一致，以完整回答为准')
+            events.append({'type': 'message', 'message': message})
+        return events
+
+__all__ = ['parse_grok_result', 'extract_artifact_text', 'iter_model_messages', 'response_error',
+           'find_conversation_id',
+           'FIND_ELEMENT_JS', 'handle_str_error',
+           'GROK_SELECTORS', 'element_js', 'wait_for_element_js',
+           'ArtifactStreamExtractor', 'GrokStreamParser']
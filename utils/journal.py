@@ -0,0 +1,65 @@
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, Optional
+from .local_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = 'data/journal.sqlite3'
+
+class RecordJournal(SQLiteStore):
+    """按 (Airtable 记录id, 运行日期) 保存每个阶段产出的本地 SQLite 检查点
+
+    dailyMission 中途崩溃后重启时，可以从最后一个完成的阶段继续，
+    避免再跑一次 10~15 分钟的 Grok 深度搜索。
+    """
+    SCHEMA = ('''
+        CREATE TABLE IF NOT EXISTS record_journal (
+            record_id TEXT NOT NULL,
+            run_date TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            value TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (record_id, run_date, stage)
+        )
+    ''',)
+
+    def __init__(self, path: Optional[str] = None, keep_days: Optional[int] = None):
+        super().__init__(path or os.getenv('JOURNAL_PATH', DEFAULT_JOURNAL_PATH))
+        if keep_days is None:
+            keep_days = int(os.getenv('JOURNAL_KEEP_DAYS', '7'))
+        self.prune(keep_days)
+        logger.info(f"[Journal] 使用检查点文件: {self.path}")
+
+    def load(self, record_id: str, run_date: str) -> Dict[str, Any]:
+        """读取某条记录当天已完成的所有阶段产出"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT stage, value FROM record_journal WHERE record_id = ? AND run_date = ?',
+                (record_id, run_date)
+            ).fetchall()
+        return {stage: json.loads(value) for stage, value in rows}
+
+    def save(self, record_id: str, run_date: str, stage: str, value: Any) -> None:
+        """写入某个阶段的产出，立即提交"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO record_journal (record_id, run_date, stage, value, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (record_id, run_date, stage, json.dumps(value, ensure_ascii=False), time.time())
+            )
+        logger.debug(f"[Journal] 已保存 {record_id}@{run_date} 的阶段 {stage}")
+
+    def prune(self, keep_days: int) -> None:
+        """删除超过 keep_days 天的检查点"""
+        cutoff = time.time() - keep_days * 86400
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                'DELETE FROM record_journal WHERE updated_at < ?', (cutoff,)
+            ).rowcount
+        if deleted:
+            logger.info(f"[Journal] 清理过期检查点 {deleted} 条")
+
+__all__ = ['RecordJournal']
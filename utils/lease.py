@@ -0,0 +1,167 @@
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from .metrics import metrics
+from .set_env import env_flag
+
+logger = logging.getLogger(__name__)
+
+# prompt 表中用于多节点认领的字段
+CLAIMED_BY_FIELD = 'claimed_by'
+LEASE_EXPIRES_FIELD = 'lease_expires'
+PROCESSED_DATE_FIELD = 'processed_date'
+
+def default_worker_id() -> str:
+    return os.getenv('WORKER_ID') or f'{socket.gethostname()}-{os.getpid()}'
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+class RecordLeaser:
+    """基于 Airtable 字段的记录租约，让多个容器共享同一张 prompt 表
+
+    认领流程：重新读取记录 -> 确认未被认领或租约已过期 -> 写入 claimed_by/lease_expires ->
+    等待 settle 秒后再读一次，只有 claimed_by 仍是自己才算认领成功（后写者胜出）。
+    持有期间由后台线程每 ttl/3 续约；完成后写入 processed_date 并清除认领，
+    当天其他节点不会再处理；节点崩溃后租约自然过期，其他节点可以重新认领。
+    """
+    def __init__(self, table, run_date: str, worker_id: Optional[str] = None,
+                 ttl: Optional[float] = None, settle: Optional[float] = None):
+        self.table = table
+        self.run_date = run_date
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl if ttl is not None else float(os.getenv('LEASE_TTL', '600'))
+        self.settle = settle if settle is not None else float(os.getenv('LEASE_SETTLE', '2'))
+        self._held: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        # 同一记录的续约、完成、释放串行执行，进行中的续约不会在释放之后重新写入认领
+        self._record_locks: Dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name='lease-heartbeat', daemon=True)
+        self._heartbeat.start()
+        logger.info(f"[Lease] worker={self.worker_id} ttl={self.ttl}s")
+
+    def is_claimable(self, fields: Dict, now: Optional[datetime] = None) -> bool:
+        """记录今天未处理，且未被认领、租约已过期或本来就是自己认领的"""
+        if fields.get(PROCESSED_DATE_FIELD) == self.run_date:
+            return False
+        owner = fields.get(CLAIMED_BY_FIELD)
+        if not owner or owner == self.worker_id:
+            return True
+        expires = parse_time(fields.get(LEASE_EXPIRES_FIELD))
+        return expires is None or expires <= (now or datetime.now(timezone.utc))
+
+    def _lease_fields(self) -> Dict[str, str]:
+        expires = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        return {CLAIMED_BY_FIELD: self.worker_id, LEASE_EXPIRES_FIELD: expires.isoformat()}
+
+    def claim(self, record_id: str) -> bool:
+        """尝试认领记录，成功返回 True"""
+        with metrics.timer('lease_claim'):
+            record = self.table.get(record_id)
+            if not self.is_claimable(record['fields']):
+                logger.info(f"[Lease] 记录 {record_id} 已被 {record['fields'].get(CLAIMED_BY_FIELD)} 认领或今天已处理")
+                metrics.incr('lease_conflicts')
+                return False
+            self.table.update(record_id, self._lease_fields())
+            if self.settle > 0:
+                time.sleep(self.settle)
+            owner = self.table.get(record_id)['fields'].get(CLAIMED_BY_FIELD)
+            if owner != self.worker_id:
+                logger.info(f"[Lease] 记录 {record_id} 被 {owner} 抢先认领")
+                metrics.incr('lease_conflicts')
+                return False
+        with self._lock:
+            self._held[record_id] = True
+        logger.info(f"[Lease] 已认领记录 {record_id}")
+        return True
+
+    def complete(self, record_id: str) -> None:
+        """标记记录今天已处理并释放租约
+
+        写入失败只记录错误：记录此时已经处理完成，不能当作失败释放给其他节点重新处理。
+        """
+        with self._record_lock(record_id):
+            self._forget(record_id)
+            try:
+                self.table.update(record_id, {
+                    PROCESSED_DATE_FIELD: self.run_date,
+                    CLAIMED_BY_FIELD: None,
+                    LEASE_EXPIRES_FIELD: None,
+                })
+                logger.info(f"[Lease] 记录 {record_id} 已完成")
+            except Exception as e:
+                metrics.incr('lease_complete_failed')
+                logger.error(f"[Lease] 标记记录 {record_id} 已完成失败，租约过期后可能被重新认领: {str(e)}")
+
+    def release(self, record_id: str) -> None:
+        """放弃租约（处理失败时），记录可被其他节点重新认领"""
+        with self._record_lock(record_id):
+            if not self._forget(record_id):
+                return
+            try:
+                self.table.update(record_id, {CLAIMED_BY_FIELD: None, LEASE_EXPIRES_FIELD: None})
+                logger.info(f"[Lease] 已释放记录 {record_id}")
+            except Exception as e:
+                logger.error(f"[Lease] 释放记录 {record_id} 失败，等待租约过期: {str(e)}")
+
+    def _record_lock(self, record_id: str) -> threading.Lock:
+        with self._lock:
+            return self._record_locks.setdefault(record_id, threading.Lock())
+
+    def _forget(self, record_id: str) -> bool:
+        with self._lock:
+            return self._held.pop(record_id, None) is not None
+
+    def renew(self, record_id: str) -> bool:
+        """续约仍由自己持有的记录；租约已被其他节点接手时不再续约并返回 False"""
+        with self._record_lock(record_id):
+            with self._lock:
+                if record_id not in self._held:
+                    return False
+            # 先重新读取：租约过期后（例如 Airtable 长时间不可用）记录可能已被其他节点认领，不能覆盖
+            owner = self.table.get(record_id)['fields'].get(CLAIMED_BY_FIELD)
+            if owner != self.worker_id:
+                self._forget(record_id)
+                metrics.incr('lease_lost')
+                logger.warning(f"[Lease] 记录 {record_id} 的租约已被 {owner} 接手，停止续约")
+                return False
+            self.table.update(record_id, self._lease_fields())
+            logger.debug(f"[Lease] 已续约记录 {record_id}")
+            return True
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            for record_id in held:
+                try:
+                    self.renew(record_id)
+                except Exception as e:
+                    logger.error(f"[Lease] 续约记录 {record_id} 失败: {str(e)}")
+
+    def close(self) -> None:
+        """停止续约并释放仍持有的租约"""
+        self._stop.set()
+        with self._lock:
+            held = list(self._held)
+        for record_id in held:
+            self.release(record_id)
+
+def lease_enabled() -> bool:
+    return env_flag('LEASE_ENABLED')
+
+__all__ = ['RecordLeaser', 'lease_enabled', 'default_worker_id',
+           'CLAIMED_BY_FIELD', 'LEASE_EXPIRES_FIELD', 'PROCESSED_DATE_FIELD']
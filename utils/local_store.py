@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, Generic, Optional, Tuple, TypeVar
+# 只用 SQLiteStore 的模块（例如 app 导入的 utils.journal）不需要加载 asyncio/aiohttp/ssl，
+# 这些在 PooledHTTPStore 中按需导入
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class SQLiteStore:
+    """本地 SQLite 文件（WAL 模式）的公共部分：建目录、建表、加锁
+
+    子类在 SCHEMA 中给出建表/建索引语句，所有读写都在 self._lock 下通过 self._conn 进行，
+    连接可以在多个线程之间共享。
+    """
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class PooledHTTPStore(SQLiteStore):
+    """带共享 aiohttp 连接池的 SQLiteStore，用于抓取结果需要落盘的异步客户端
+
+    session 在 utils.aio 的后台事件循环上按需创建，同一主机最多 concurrency 个连接并保持长连接；
+    进行中的请求放在 self._tasks 中（键由子类决定），close 时取消。
+    事件循环上的 SQLite 读写用 asyncio.to_thread 放到线程池执行，不阻塞共享循环上的其他请求。
+
+    Args:
+        path: SQLite 文件
+        concurrency: 同一主机的最大连接数
+        timeout: 单个请求的超时（秒）
+        headers: session 的默认请求头
+        verify_ssl: 为 False 时不校验证书（nitter 实例常用自签名证书）
+    """
+    def __init__(self, path: str, concurrency: int, timeout: float,
+                 headers: Optional[Dict[str, str]] = None, verify_ssl: bool = True):
+        super().__init__(path)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.verify_ssl = verify_ssl
+        self._session = None
+        self._tasks: Dict = {}
+
+    def _session_for_loop(self):
+        import ssl
+        import aiohttp
+        if self._session is None or self._session.closed:
+            ssl_context = None
+            if not self.verify_ssl:
+                ssl_context = ssl.create_default_context()
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+            connector = aiohttp.TCPConnector(limit_per_host=self.concurrency, keepalive_timeout=60,
+                                             ssl=ssl_context if ssl_context is not None else True)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _close_session(self) -> None:
+        import asyncio
+        tasks, self._tasks = list(self._tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self) -> None:
+        """取消进行中的请求、关闭 session（在后台事件循环上执行）并关闭数据库，与 SQLiteStore.close 一样是同步的"""
+        from .aio import run_sync
+        run_sync(self._close_session())
+        super().close()
+
+class SharedInstance(Generic[T]):
+    """进程内共享的单例：get 时按需用 factory 创建，close 时调用实例的 close()，下次 get 重新创建"""
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._factory()
+            return self._instance
+
+    def close(self) -> None:
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None:
+            instance.close()
+
+__all__ = ['SQLiteStore', 'PooledHTTPStore', 'SharedInstance']
@@ -0,0 +1,148 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PATH = 'data/metrics.jsonl'
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩法计算百分位数，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[k]
+
+class RunMetrics:
+    """记录一次 dailyMission 运行中各阶段的耗时、次数和失败次数
+
+    用法:
+        with metrics.timer('grok_answer'):
+            ...
+    运行结束后调用 export() 写出 Prometheus textfile（.prom）或追加一行 JSON（其他后缀）。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._durations: Dict[str, List[float]] = {}
+            self._failures: Dict[str, int] = {}
+            self._counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, duration: float, ok: bool = True) -> None:
+        with self._lock:
+            self._durations.setdefault(stage, []).append(duration)
+            if not ok:
+                self._failures[stage] = self._failures.get(stage, 0) + 1
+            else:
+                self._failures.setdefault(stage, 0)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str):
+        """计时上下文，代码块抛出异常时记为失败并继续抛出"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.observe(stage, time.perf_counter() - start, ok)
+
+    def summary(self) -> Dict:
+        """返回各阶段统计：count / failures / sum / min / max / p50 / p95（单位：秒）"""
+        with self._lock:
+            stages = {}
+            for stage, values in self._durations.items():
+                stages[stage] = {
+                    'count': len(values),
+                    'failures': self._failures.get(stage, 0),
+                    'sum': round(sum(values), 4),
+                    'min': round(min(values), 4),
+                    'max': round(max(values), 4),
+                    'p50': round(percentile(values, 0.5), 4),
+                    'p95': round(percentile(values, 0.95), 4),
+                }
+            return {
+                'started_at': self.started_at,
+                'finished_at': time.time(),
+                'duration': round(time.time() - self.started_at, 4),
+                'stages': stages,
+                'counters': dict(self._counters),
+            }
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        """写出本次运行的指标，路径默认读取环境变量 METRICS_PATH"""
+        path = path or os.getenv('METRICS_PATH', DEFAULT_METRICS_PATH)
+        if not path:
+            return None
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        data = self.summary()
+        try:
+            if path.endswith('.prom'):
+                # textfile collector 要求原子替换，先写临时文件再重命名
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.to_prometheus(data))
+                os.replace(tmp_path, path)
+            else:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(data, ensure_ascii=False) + '\n')
+            logger.info(f"[Metrics] 已写出运行指标: {path}")
+        except OSError as e:
+            logger.error(f"[Metrics] 写出运行指标失败: {str(e)}")
+            return None
+        return path
+
+    @staticmethod
+    def to_prometheus(data: Dict) -> str:
+        lines = [
+            '# HELP deepsearch_stage_duration_seconds Duration of dailyMission stages.',
+            '# TYPE deepsearch_stage_duration_seconds summary',
+        ]
+        for stage, s in sorted(data['stages'].items()):
+            lines.append(f'deepsearch_stage_duration_seconds{{stage="{stage}",quantile="0.5"}} {s["p50"]}')
+            lines.append(f'deepsearch_stage_duration_seconds{{stage="{stage}",quantile="0.95"}} {s["p95"]}')
+            lines.append(f'deepsearch_stage_duration_seconds_sum{{stage="{stage}"}} {s["sum"]}')
+            lines.append(f'deepsearch_stage_duration_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += [
+            '# HELP deepsearch_stage_failures_total Failed calls of dailyMission stages.',
+            '# TYPE deepsearch_stage_failures_total counter',
+        ]
+        for stage, s in sorted(data['stages'].items()):
+            lines.append(f'deepsearch_stage_failures_total{{stage="{stage}"}} {s["failures"]}')
+        lines += [
+            '# HELP deepsearch_run_events_total Event counters of the last dailyMission run.',
+            '# TYPE deepsearch_run_events_total counter',
+        ]
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f'deepsearch_run_events_total{{name="{name}"}} {value}')
+        lines += [
+            '# HELP deepsearch_run_duration_seconds Wall-clock duration of the last dailyMission run.',
+            '# TYPE deepsearch_run_duration_seconds gauge',
+            f'deepsearch_run_duration_seconds {data["duration"]}',
+            '# HELP deepsearch_run_finished_timestamp_seconds Unix time the last dailyMission run finished.',
+            '# TYPE deepsearch_run_finished_timestamp_seconds gauge',
+            f'deepsearch_run_finished_timestamp_seconds {data["finished_at"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+# 进程内共享的指标实例
+metrics = RunMetrics()
+
+__all__ = ['RunMetrics', 'metrics', 'percentile']
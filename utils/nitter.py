@@ -1,14 +1,36 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import requests
 import time as t
+import calendar
 import logging
 import os,re
+import html
+from itertools import groupby
+from operator import methodcaller
 from feedparser import parse
 import html2text
+from .rss_fetch import fetch_feed, fetch_feeds
+from .feed_state import get_feed_state
+from .metrics import metrics
+from .set_env import env_flag
 
 logger = logging.getLogger(__name__)
 
 XURL = 'https://x.com/'
+
+# nitter 的链接改写为 x.com 并去掉结尾的 #m，一次扫描完成
+NITTER_LINK = re.compile(r'(?:http://)?localhost:8080|#m\b')
+# 推文链接 (是否 tweet-link, 用户名/status/id)：以字面量 href="/ 开头才能使用正则的快速前缀查找，
+# tweet-link 由紧跟其后的后顾断言判断，一次扫描同时得到 thread 推文和其他推文链接
+THREAD_LINK = re.compile(r'href="/(?:(?<=(tweet-link)" href="/))?([^"]+/status/\d+)#m"')
+# 推文 HTML 转文本：空白折叠、标签替换各一次扫描
+HTML_SPACE = re.compile(r'\s+')
+HTML_TAG = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*>')
+BLANK_LINES = re.compile(r' *\n[ \n]*\n *')
+# 推文内容只会被转成纯文本，不需要 feedparser 清理 HTML 和补全相对链接（解析耗时约减半）
+FEED_PARSE_OPTIONS = {'sanitize_html': False, 'resolve_relative_uris': False}
+BLOCK_TAGS = frozenset(('p', 'div', 'blockquote', 'hr', 'ul', 'ol', 'li', 'pre', 'table', 'tr',
+                        'h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
 DEFAULT_HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
     'Accept-Language': 'zh-CN,zh-TW;q=0.9,zh;q=0.8,en-US;q=0.7,en;q=0.6',
@@ -47,65 +69,37 @@ def get_tweet_nitter(
 def extract_thread_links_nitter(html_content: str) -> list:
     """从HTML内容中提取thread的所有推文链接
 
+    THREAD_LINK 只扫描一遍 HTML，同时得到 tweet-link 链接和其他推文链接（原来的备用模式）；
+    有 tweet-link 时只用 tweet-link，再按是否原作者分组取最长的连续序列。
+
     Args:
         html_content: nitter返回的HTML内容
 
     Returns:
         list: thread中所有推文的链接列表,如果不是thread则返回空列表
     """
-    # 使用正则表达式匹配所有推文链接
-    pattern = r'class="tweet-link" href="/([^"]+/status/\d+)#m"'
-    matches = re.findall(pattern, html_content)
-
-    logger.debug(f"正则表达式匹配到的原始链接: {matches}")
-
-    # 如果没有找到链接，尝试其他可能的模式
-    if not matches:
-        logger.info("尝试备用正则表达式模式")
-        patterns = [
-            r'href="/([^"]+/status/\d+)#m"',
-            r'<a[^>]+href="/([^"]+/status/\d+)#m"[^>]*>',
-            r'class="tweet-link"[^>]+href="/([^"]+/status/\d+)#m"'
-        ]
-
-        for p in patterns:
-            matches = re.findall(p, html_content)
-            if matches:
-                logger.info(f"使用备用模式 '{p}' 找到链接")
-                break
-
-    if not matches:
+    matches = THREAD_LINK.findall(html_content)
+    candidates = [link for tweet_link, link in matches if tweet_link]
+    if not candidates and matches:
+        logger.info("未找到 tweet-link，使用备用模式")
+        candidates = [link for _, link in matches]
+    if not candidates:
         logger.warning("未找到任何推文链接")
         # 输出HTML片段以帮助调试
         logger.debug(f"HTML片段预览:\n{html_content[:1000]}")
         return []
 
     # 提取原始作者用户名（从第一个链接）
-    first_link = matches[0]
-    original_author = first_link.split('/')[0]
+    original_author = candidates[0].split('/')[0]
     logger.info(f"原始作者: {original_author}")
 
-    # 找到连续的原作者推文
+    # 找到连续的原作者推文（长度相同时取先出现的）
     continuous_tweets = []
-    current_sequence = []
-
-    for link in matches:
-        current_author = link.split('/')[0]
-        if current_author == original_author:
-            current_sequence.append(link)
-        else:
-            # 如果遇到其他作者的推文，保存当前最长序列并重置
-            if len(current_sequence) > len(continuous_tweets):
-                continuous_tweets = current_sequence.copy()
-            current_sequence = []
-
-    # 检查最后一个序列
-    if len(current_sequence) > len(continuous_tweets):
-        continuous_tweets = current_sequence
-
-    if not continuous_tweets:
-        logger.warning("未找到原始作者的连续推文")
-        return []
+    for is_original, run in groupby(candidates, key=methodcaller('startswith', original_author + '/')):
+        if is_original:
+            run = list(run)
+            if len(run) > len(continuous_tweets):
+                continuous_tweets = run
 
     # 去重并保持顺序
     links = list(dict.fromkeys(continuous_tweets))
@@ -121,39 +115,137 @@ def check_thread_using_nitter(nitter_link:str):
     links = extract_thread_links_nitter(rawhtml)
     return links
 
-def nitter_list_rss(rss_url, max_num=None):
-    """将RSS内容转换为markdown格式的文本
+def _nitter_link(match) -> str:
+    return '' if match.group() == '#m' else 'x.com'
 
-    Args:
-        list_id: nitter list的ID
+def rewrite_nitter_links(text: str) -> str:
+    """localhost:8080 改为 x.com，去掉推文链接结尾的 #m（不影响 #ml 这样的话题标签）"""
+    return NITTER_LINK.sub(_nitter_link, text)
 
-    Returns:
-        str: 包含所有条目的markdown格式文本
-    """
+def _html_tag(match) -> str:
+    name = match.group(2).lower()
+    if name == 'br':
+        return '\n'
+    return '\n\n' if name in BLOCK_TAGS else ''
 
-    feed = parse(rss_url)
+def tweet_html_to_text(content: str) -> str:
+    """把 nitter RSS 中的推文 HTML 转成纯文本
+
+    只处理推文里出现的结构：段落和块级标签变为空行，<br> 变为换行，链接保留文字，图片丢弃。
+    与 html2text（ignore_links/ignore_images）的输出相比不折行、不转义 Markdown 字符。
+    """
+    text = HTML_TAG.sub(_html_tag, HTML_SPACE.sub(' ', content))
+    text = BLANK_LINES.sub('\n\n', text).replace(' \n', '\n').replace('\n ', '\n').strip()
+    return html.unescape(text).replace('\xa0', ' ') + '\n\n' if text else ''
+
+def html2text_converter() -> html2text.HTML2Text:
+    """与原来逐条新建时配置相同的 html2text 转换器，可复用于多条内容"""
+    text_maker = html2text.HTML2Text()
+    text_maker.ignore_images = True
+    text_maker.ignore_links = True
+    return text_maker
+
+def entries_to_markdown(entries, converter: Optional[html2text.HTML2Text] = None,
+                        threads: Optional[List[List[str]]] = None) -> str:
+    """把一批 feed 条目转成带编号和链接的 markdown 文本
+
+    默认用 tweet_html_to_text 转换推文内容；传入 converter（见 html2text_converter）时改用 html2text，
+    整批共用同一个转换器。threads 与 entries 一一对应，条目属于多条推文的 thread 时附上 thread 的所有链接。
+    """
+    convert = converter.handle if converter is not None else tweet_html_to_text
     result = []
+    for i, entry in enumerate(entries):
+        link = rewrite_nitter_links(entry.link)
+        content = convert(rewrite_nitter_links(entry.description))
+        thread = threads[i] if threads else None
+        if thread and len(thread) > 1:
+            content += f"thread: {' '.join(thread)}\n"
+        result.append(f"[{i}]({link})\n{content}\n---\n")
+    return "\n".join(result)
 
-    for i in range(len(feed.entries)):
-        if max_num and max_num>=i+1:
-            break
-        entry = feed.entries[i]
-        link = entry.link.replace('http://localhost:8080','x.com').replace('localhost:8080','x.com').replace('#m','')
-        text_maker = html2text.HTML2Text()
-        text_maker.ignore_images = True   # 保留图片
-        text_maker.ignore_links = True    # 保留链接
-        content = entry.description.replace('http://localhost:8080','x.com').replace('localhost:8080','x.com').replace('#m','')
-        content = text_maker.handle(content)
-        markdown_text = f"[{i}]({link})\n{content}\n---\n"
-        result.append(markdown_text)
+def expand_entry_threads(entries) -> List[List[str]]:
+    """并发展开每个条目所在的 thread（见 utils.nitter_threads），返回与 entries 对应的链接列表"""
+    from .nitter_threads import expand_threads, nitter_status_url
+    urls = [nitter_status_url(entry.get('link', '')) for entry in entries]
+    expanded = expand_threads([url for url in urls if url])
+    return [expanded.get(url, []) if url else [] for url in urls]
+
+def rss_since_last_run() -> bool:
+    return env_flag('RSS_SINCE_LAST_RUN')
+
+def entry_guid(entry) -> str:
+    return entry.get('id') or entry.get('link', '')
+
+def entry_timestamp(entry) -> Optional[float]:
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed) if parsed else None
+
+def select_entries(rss_url, entries, max_num=None, since_last_run=False, max_age_hours=0):
+    """按时间窗口、是否已用过（since_last_run）和数量上限筛选条目，不记录已用"""
+    if max_age_hours:
+        cutoff = t.time() - max_age_hours * 3600
+        entries = [e for e in entries if (entry_timestamp(e) or cutoff) >= cutoff]
+    if since_last_run:
+        state = get_feed_state()
+        seen = state.seen(rss_url, [entry_guid(e) for e in entries])
+        if seen:
+            metrics.incr('rss_entries_seen', len(seen))
+        entries = [e for e in entries if entry_guid(e) not in seen]
+    if max_num:
+        entries = entries[:max_num]
+    metrics.incr('rss_entries_new', len(entries))
+    return entries
+
+def mark_entries_seen(rss_url, seen):
+    """把 nitter_list_rss(..., return_seen=True) 返回的 (guid, 发布时间戳) 记为已用"""
+    if seen:
+        get_feed_state().mark_seen(rss_url, seen)
+
+def nitter_list_rss(rss_url, max_num=None, body=None, since_last_run=None, max_age_hours=None,
+                    with_threads=None, return_seen=False):
+    """将RSS内容转换为markdown格式的文本
 
-    return "\n".join(result)
+    Args:
+        rss_url: nitter list的RSS地址
+        max_num: 最多保留的条目数（按 feed 顺序，即最新的在前）
+        body: 已抓取的RSS内容，默认通过 utils.rss_fetch 抓取（连接复用、条件请求）
+        since_last_run: 只保留之前没有用过的条目（见 utils.feed_state），默认读取 RSS_SINCE_LAST_RUN
+        max_age_hours: 只保留最近多少小时内发布的条目，默认读取 RSS_MAX_AGE_HOURS，0 表示不限制
+        with_threads: 并发展开条目所在的 thread 并附上链接，默认读取 RSS_EXPAND_THREADS
+        return_seen: 为 True 时不立即把选中的条目记为已用，而是返回 (markdown, 选中条目的 (guid, 发布时间戳) 列表)，
+            由调用方在结果确实用上之后调用 mark_entries_seen；未启用 since_last_run 时列表为空
+
+    Returns:
+        str: 包含所有条目的markdown格式文本，没有符合条件的条目时为空字符串
+    """
+    if since_last_run is None:
+        since_last_run = rss_since_last_run()
+    if max_age_hours is None:
+        max_age_hours = float(os.getenv('RSS_MAX_AGE_HOURS') or 0)
+    if with_threads is None:
+        with_threads = env_flag('RSS_EXPAND_THREADS')
+
+    if body is None:
+        body = fetch_feed(rss_url)
+    feed = parse(body, **FEED_PARSE_OPTIONS)
+    entries = select_entries(rss_url, feed.entries, max_num, since_last_run, max_age_hours)
+    logger.info(f"[RSS] {rss_url} 共 {len(feed.entries)} 条，使用 {len(entries)} 条")
+    converter = html2text_converter() if env_flag('RSS_HTML2TEXT') else None
+    threads = None
+    if with_threads and entries:
+        with metrics.timer('rss_threads'):
+            threads = expand_entry_threads(entries)
+    markdown = entries_to_markdown(entries, converter, threads)
+    seen = [(entry_guid(e), entry_timestamp(e)) for e in entries] if since_last_run else []
+    if return_seen:
+        return markdown, seen
+    mark_entries_seen(rss_url, seen)
+    return markdown
 
 def AI_news_tweets() -> List[str]:
-    lists_txt = []
-    for id in os.environ['LIST_IDS'].split(','):
-        lists_txt.append(nitter_list_rss(id.strip()))
-    return lists_txt
+    # 所有 list 并发抓取，再逐个解析
+    urls = [id.strip() for id in os.environ['LIST_IDS'].split(',')]
+    return [nitter_list_rss(url, body=body) for url, body in zip(urls, fetch_feeds(urls))]
 
 
 if __name__ == '__main__':
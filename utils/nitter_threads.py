@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from .aio import run_sync
+from .metrics import metrics
+from .local_store import PooledHTTPStore, SharedInstance
+from .nitter import DEFAULT_HEADERS, extract_thread_links_nitter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'data/thread_cache.sqlite3'
+
+STATUS_PATH = re.compile(r'/([^/?#]+)/status/(\d+)')
+
+def nitter_status_url(link: str, base_url: Optional[str] = None) -> Optional[str]:
+    """把 RSS 条目链接转成 nitter 推文页地址，默认沿用链接本身的主机（NITTER_URL 可覆盖）"""
+    match = STATUS_PATH.search(link)
+    if not match:
+        return None
+    base_url = base_url or os.getenv('NITTER_URL')
+    if not base_url:
+        parts = urlsplit(link)
+        base_url = f'{parts.scheme}://{parts.netloc}' if parts.netloc else 'http://localhost:8080'
+    return f"{base_url.rstrip('/')}/{match.group(1)}/status/{match.group(2)}"
+
+class ThreadExpander(PooledHTTPStore):
+    """并发展开推文所在的 thread（原作者连续发布的推文链接）
+
+    nitter 推文页通过共享的 aiohttp 连接池抓取（与 get_tweet_nitter 相同的请求头、不校验证书），
+    同一主机最多 concurrency 个并发请求。结果按 status id 缓存在本地 SQLite 中，ttl 秒内不再请求；
+    抓取失败的推文返回空列表且不缓存。
+
+    Args:
+        path: 缓存文件，默认读取 THREAD_CACHE_PATH
+        concurrency: 同一主机的最大并发请求数，默认读取 NITTER_CONCURRENCY
+        ttl: 缓存有效期（秒），默认读取 THREAD_CACHE_TTL
+        timeout: 单个请求的超时（秒），默认读取 NITTER_TIMEOUT
+    """
+    SCHEMA = ('''
+        CREATE TABLE IF NOT EXISTS thread_cache (
+            status_id INTEGER PRIMARY KEY,
+            links TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+    ''',)
+
+    def __init__(self, path: Optional[str] = None, concurrency: Optional[int] = None,
+                 ttl: Optional[float] = None, timeout: Optional[float] = None):
+        # 同一条推文同时只请求一次（_tasks 以 status id 为键）
+        super().__init__(
+            path or os.getenv('THREAD_CACHE_PATH', DEFAULT_CACHE_PATH),
+            concurrency or int(os.getenv('NITTER_CONCURRENCY', '4')),
+            timeout or float(os.getenv('NITTER_TIMEOUT', '30')),
+            {key: DEFAULT_HEADERS[key] for key in ('Accept', 'Accept-Language', 'Authorization', 'User-Agent')},
+            verify_ssl=False,
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv('THREAD_CACHE_TTL', str(7 * 86400)))
+
+    def _cached(self, status_id: int) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT links, fetched_at FROM thread_cache WHERE status_id = ?', (status_id,)
+            ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def _store(self, status_id: int, links: List[str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO thread_cache (status_id, links, fetched_at) VALUES (?, ?, ?)',
+                (status_id, json.dumps(links), now)
+            )
+            self._conn.execute('DELETE FROM thread_cache WHERE fetched_at < ?', (now - self.ttl,))
+
+    async def _expand(self, status_id: int, url: str) -> List[str]:
+        start = time.perf_counter()
+        try:
+            async with self._session_for_loop().get(url) as response:
+                response.raise_for_status()
+                html = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            metrics.observe('nitter_thread', time.perf_counter() - start, False)
+            logger.warning(f'[Thread] 获取推文失败: {url}: {type(e).__name__}: {e}')
+            return []
+        metrics.observe('nitter_thread', time.perf_counter() - start)
+        # 长对话页的解析放到线程池，不阻塞共享事件循环上的其他请求
+        links = await asyncio.to_thread(extract_thread_links_nitter, html)
+        await asyncio.to_thread(self._store, status_id, links)
+        return links
+
+    async def expand(self, url: str) -> List[str]:
+        """返回 nitter 推文页 url 所在 thread 的推文链接（x.com），不是 thread 时返回空列表"""
+        match = STATUS_PATH.search(url)
+        if not match:
+            return []
+        status_id = int(match.group(2))
+        cached = await asyncio.to_thread(self._cached, status_id)
+        if cached is not None:
+            metrics.incr('nitter_thread_cache_hit')
+            return cached
+        task = self._tasks.get(status_id)
+        if task is None:
+            task = self._tasks[status_id] = asyncio.ensure_future(self._expand(status_id, url))
+            task.add_done_callback(lambda _: self._tasks.pop(status_id, None))
+        return await asyncio.shield(task)
+
+    async def expand_many(self, urls: List[str]) -> Dict[str, List[str]]:
+        """并发展开多条推文，返回 {url: thread 链接}"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.expand(url) for url in urls))
+        return dict(zip(urls, results))
+
+_expander = SharedInstance(ThreadExpander)
+
+def get_thread_expander() -> ThreadExpander:
+    """进程内共享的 thread 展开器"""
+    return _expander.get()
+
+async def expand_threads_async(urls: List[str]) -> Dict[str, List[str]]:
+    """异步API：并发展开多条 nitter 推文所在的 thread"""
+    return await get_thread_expander().expand_many(urls)
+
+def expand_threads(urls: List[str]) -> Dict[str, List[str]]:
+    """同步API：可从任意非事件循环线程调用，返回 {url: thread 链接}"""
+    return run_sync(expand_threads_async(urls))
+
+def close_thread_expander():
+    """关闭连接池，下次展开时重新创建"""
+    _expander.close()
+
+__all__ = ['ThreadExpander', 'get_thread_expander', 'expand_threads', 'expand_threads_async',
+           'close_thread_expander', 'nitter_status_url']
@@ -1,10 +1,15 @@
+import os
 import re
 from notion_client import Client
 import logging
+from .metrics import metrics
 
 class NotionMarkdownManager:
     def __init__(self, api_key, database_id):
-        self.notion = Client(auth=api_key)
+        options = {'auth': api_key}
+        if os.getenv('NOTION_BASE_URL'):
+            options['base_url'] = os.environ['NOTION_BASE_URL']
+        self.notion = Client(**options)
         self.database_id = database_id
 
     def list_articles_in_status(self,status:str):
@@ -502,7 +507,8 @@ class NotionMarkdownManager:
             }
 
         # 创建页面
-        response = self.notion.pages.create(**create_params)
+        with metrics.timer('notion_create'):
+            response = self.notion.pages.create(**create_params)
         page_id = response['id']
         logging.info(f"创建空页面成功，ID: {page_id}")
 
@@ -511,10 +517,11 @@ class NotionMarkdownManager:
         for i in range(0, len(blocks), chunk_size):
             chunk = blocks[i:i + chunk_size]
             logging.info(f"添加第 {i//chunk_size + 1} 批块，数量: {len(chunk)}")
-            self.notion.blocks.children.append(
-                block_id=page_id,
-                children=chunk
-            )
+            with metrics.timer('notion_append'):
+                self.notion.blocks.children.append(
+                    block_id=page_id,
+                    children=chunk
+                )
 
         return page_id
 
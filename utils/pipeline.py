@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Stage:
+    """流水线中的一个阶段
+
+    Args:
+        name: 阶段名称，用于日志
+        func: 处理函数，接收单个任务上下文；返回 False 表示跳过后续阶段，抛出异常（任何 BaseException）表示任务失败
+        concurrency: 该阶段同时运行的 worker 数
+    """
+    def __init__(self, name: str, func: Callable[[Any], Optional[bool]], concurrency: int = 1):
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, int(concurrency))
+
+class PipelineJob:
+    """单个任务在流水线中的执行结果"""
+    def __init__(self, idx: int, item: Any):
+        self.idx = idx
+        self.item = item
+        self.status = 'pending'  # pending / done / skipped / failed
+        self.error: Optional[BaseException] = None
+        self.failed_stage: Optional[str] = None
+
+class Pipeline:
+    """由队列连接的多阶段流水线
+
+    每个阶段拥有自己的输入队列和 worker 线程，任务在前一阶段完成后立即进入下一阶段的队列，
+    因此第 i 个任务的后续阶段可以和第 i+1 个任务的前置阶段（如 Grok 深度搜索）同时执行。
+    """
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline 至少需要一个阶段")
+        self.stages = stages
+
+    def run(self, items: Iterable[Any]) -> List[PipelineJob]:
+        """运行流水线直到所有任务完成，按输入顺序返回结果"""
+        jobs = [PipelineJob(idx, item) for idx, item in enumerate(items)]
+        if not jobs:
+            return jobs
+
+        queues = [queue.Queue() for _ in self.stages]
+        remaining = len(jobs)
+        remaining_lock = threading.Lock()
+        all_done = threading.Event()
+
+        def finish(job: PipelineJob):
+            nonlocal remaining
+            with remaining_lock:
+                remaining -= 1
+                if remaining == 0:
+                    all_done.set()
+
+        def worker(stage_idx: int):
+            stage = self.stages[stage_idx]
+            q = queues[stage_idx]
+            while True:
+                job = q.get()
+                if job is None:
+                    break
+                try:
+                    with metrics.timer(f'pipeline_{stage.name}'):
+                        result = stage.func(job.item)
+                    if result is False:
+                        logger.info(f"[流水线][{stage.name}] 任务 {job.idx} 跳过后续阶段")
+                        job.status = 'skipped'
+                        finish(job)
+                        continue
+                except BaseException as e:
+                    # 包括 run_sync 抛出的 concurrent.futures.CancelledError 等非 Exception：
+                    # 都记为任务失败，否则 finish 不会被调用，run 会一直等待
+                    job.status = 'failed'
+                    job.error = e
+                    job.failed_stage = stage.name
+                    finish(job)
+                    continue
+
+                if stage_idx + 1 < len(self.stages):
+                    queues[stage_idx + 1].put(job)
+                else:
+                    job.status = 'done'
+                    finish(job)
+
+        threads = []
+        for stage_idx, stage in enumerate(self.stages):
+            for n in range(stage.concurrency):
+                t = threading.Thread(
+                    target=worker,
+                    args=(stage_idx,),
+                    name=f'pipeline-{stage.name}-{n}',
+                    daemon=True
+                )
+                t.start()
+                threads.append(t)
+        logger.info("[流水线] 启动阶段: " + ", ".join(f"{s.name}x{s.concurrency}" for s in self.stages))
+
+        for job in jobs:
+            queues[0].put(job)
+
+        all_done.wait()
+        for stage_idx, stage in enumerate(self.stages):
+            for _ in range(stage.concurrency):
+                queues[stage_idx].put(None)
+        for t in threads:
+            t.join()
+        return jobs
+
+__all__ = ['Stage', 'Pipeline', 'PipelineJob']
@@ -0,0 +1,145 @@
+import os
+import time
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+import aiohttp
+from .aio import run_sync, submit
+from .metrics import metrics
+from .local_store import PooledHTTPStore, SharedInstance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'data/rss_cache.sqlite3'
+
+RSS_HEADERS = {
+    'Accept': 'application/rss+xml, application/xml;q=0.9, */*;q=0.8',
+    'Accept-Language': 'zh-CN,zh-TW;q=0.9,zh;q=0.8,en-US;q=0.7,en;q=0.6',
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36',
+}
+
+class FeedFetcher(PooledHTTPStore):
+    """共享连接池的异步 RSS 抓取，支持条件请求
+
+    所有请求复用同一个 aiohttp session（运行在 utils.aio 的后台事件循环上），到 nitter 的连接保持长连接。
+    每个地址上次响应的 ETag/Last-Modified 和内容保存在本地 SQLite 中，下次请求带上
+    If-None-Match/If-Modified-Since，未变化的 feed 只返回 304，直接使用保存的内容。
+    请求失败时退回到上次保存的内容，没有保存过时抛出 RuntimeError，调用方按失败处理（不能当作没有新推文）。
+
+    Args:
+        path: 缓存文件，默认读取 RSS_CACHE_PATH
+        concurrency: 同一主机的最大连接数，默认读取 RSS_CONCURRENCY
+        timeout: 单个请求的超时（秒），默认读取 RSS_TIMEOUT
+    """
+    SCHEMA = ('''
+        CREATE TABLE IF NOT EXISTS rss_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+    ''',)
+
+    def __init__(self, path: Optional[str] = None, concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        # 预取的请求保存在 _tasks 中，fetch 时直接取用结果
+        super().__init__(
+            path or os.getenv('RSS_CACHE_PATH', DEFAULT_CACHE_PATH),
+            concurrency or int(os.getenv('RSS_CONCURRENCY', '8')),
+            timeout or float(os.getenv('RSS_TIMEOUT', '30')),
+            RSS_HEADERS,
+        )
+
+    def _cached(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT etag, last_modified, body FROM rss_cache WHERE url = ?', (url,)
+            ).fetchone()
+
+    def _store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO rss_cache (url, etag, last_modified, body, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?)', (url, etag, last_modified, body, time.time())
+            )
+
+    async def _fetch(self, url: str) -> bytes:
+        cached = await asyncio.to_thread(self._cached, url)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        start = time.perf_counter()
+        try:
+            async with self._session_for_loop().get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    metrics.observe('rss_request', time.perf_counter() - start)
+                    metrics.incr('rss_not_modified')
+                    logger.debug(f'[RSS] 未变化: {url}')
+                    return cached[2]
+                response.raise_for_status()
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            metrics.observe('rss_request', time.perf_counter() - start, False)
+            if cached:
+                logger.warning(f'[RSS] 抓取失败，使用上次的内容: {url}: {type(e).__name__}: {e}')
+                return cached[2]
+            logger.error(f'[RSS] 抓取失败: {url}: {type(e).__name__}: {e}')
+            raise RuntimeError(f'RSS 抓取失败: {url}: {type(e).__name__}: {e}') from e
+        metrics.observe('rss_request', time.perf_counter() - start)
+        metrics.incr('rss_fetched')
+        await asyncio.to_thread(self._store, url, response.headers.get('ETag'), response.headers.get('Last-Modified'), body)
+        return body
+
+    def _task(self, url: str) -> asyncio.Task:
+        task = self._tasks.get(url)
+        if task is None:
+            task = self._tasks[url] = asyncio.ensure_future(self._fetch(url))
+        return task
+
+    async def fetch(self, url: str) -> bytes:
+        """返回 feed 内容；已预取或正在抓取的地址直接等待其结果，抓取失败且没有保存的内容时抛出 RuntimeError"""
+        task = self._task(url)
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done() and self._tasks.get(url) is task:
+                del self._tasks[url]
+
+    async def fetch_many(self, urls: List[str]) -> List[bytes]:
+        """并发抓取多个 feed，按 urls 的顺序返回内容"""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    async def prefetch(self, urls: List[str]) -> None:
+        """在后台开始抓取，之后的 fetch 直接使用结果"""
+        for url in dict.fromkeys(urls):
+            self._task(url)
+
+_fetcher = SharedInstance(FeedFetcher)
+
+def get_feed_fetcher() -> FeedFetcher:
+    """进程内共享的 feed 抓取器"""
+    return _fetcher.get()
+
+def fetch_feed(url: str) -> bytes:
+    """同步抓取单个 feed，可从任意非事件循环线程调用"""
+    return run_sync(get_feed_fetcher().fetch(url))
+
+def fetch_feeds(urls: List[str]) -> List[bytes]:
+    """同步并发抓取多个 feed，按 urls 的顺序返回内容"""
+    return run_sync(get_feed_fetcher().fetch_many(urls))
+
+def prefetch_feeds(urls: List[str]):
+    """在后台开始抓取多个 feed，不阻塞调用方"""
+    return submit(get_feed_fetcher().prefetch(urls))
+
+def close_feed_fetcher():
+    """关闭连接池，下次抓取时重新创建"""
+    _fetcher.close()
+
+__all__ = ['FeedFetcher', 'get_feed_fetcher', 'fetch_feed', 'fetch_feeds', 'prefetch_feeds', 'close_feed_fetcher']
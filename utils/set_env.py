@@ -1,41 +1,168 @@
 import os
+import json
+import time
 import logging
-from pyairtable import Table
+import threading
 
-def set_env_from_airtable_data():
-    """从 Airtable 数据设置环境变量，dreamina 优先尝试 browser_cookie3 获取 sessionid，获取不到再用 Airtable 的 api key"""
-    logging.info("开始设置环境变量")
-    data = Table(
-            os.environ['AIRTABLE_KEY'],
-            os.environ['AIRTABLE_BASE_ID'],
-            'APIKeys'
-        ).all(formula="{category} = 'deepsearch'")
-    # 映射 Airtable 记录到环境变量
+DEFAULT_CONFIG_SNAPSHOT_PATH = 'data/config_snapshot.json'
+
+def env_flag(name, default=False):
+    """读取开关类环境变量：1/true/yes 为 True，0/false/no 为 False，未设置或其他值返回 default"""
+    value = os.getenv(name, '').strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    return default
+
+def get_airtable_table(table_name, **options):
+    """创建 Airtable Table，环境变量 AIRTABLE_ENDPOINT_URL 可指向其他 API 地址（如本地假服务）"""
+    from pyairtable import Table
+    if os.getenv('AIRTABLE_ENDPOINT_URL'):
+        options['endpoint_url'] = os.environ['AIRTABLE_ENDPOINT_URL']
+    return Table(
+        os.environ['AIRTABLE_KEY'],
+        os.environ['AIRTABLE_BASE_ID'],
+        table_name,
+        **options
+    )
+
+def records_to_env(data):
+    """把 APIKeys 表的记录映射为环境变量"""
+    env = {}
     for record in data:
         fields = record['fields']
         name = fields.get('Name', '').lower()
-        
+
         if name == 'notion':
-            os.environ['NOTION_API_KEY'] = fields['key']
-            os.environ['NOTION_DATABASE_ID'] = fields['db_id']
-            logging.info("已设置 Notion 相关环境变量")
-            
+            env['NOTION_API_KEY'] = fields['key']
+            env['NOTION_DATABASE_ID'] = fields['db_id']
+
         elif name == 'openrouter':
-            os.environ['OPENROUTER_API_KEY'] = fields['key']
-            os.environ['OPENROUTER_BASE_URL'] = fields['endpoint']
-            logging.info("已设置 OpenRouter 相关环境变量")
+            env['OPENROUTER_API_KEY'] = fields['key']
+            env['OPENROUTER_BASE_URL'] = fields['endpoint']
 
         elif name == 'time':
-            os.environ['DAILY_TIME'] = fields['key']
-            logging.info("已设置每日时间环境变量")
-            
+            env['DAILY_TIME'] = fields['key']
+
         elif name == 'discord':
-            os.environ['DISCORD_WEBHOOK_URL'] = fields['endpoint']
-            logging.info("已设置 Discord Webhook 环境变量")
-            
+            env['DISCORD_WEBHOOK_URL'] = fields['endpoint']
+
         elif name == 'dreamina':
-            os.environ['DREAMINA_BASE_URL'] = fields['endpoint']
-            os.environ['DREAMINA_API_KEY'] = fields['key']
-            logging.info('已设置 DREAMINA_API_KEY')
+            env['DREAMINA_BASE_URL'] = fields['endpoint']
+            env['DREAMINA_API_KEY'] = fields['key']
+    return env
+
+class ConfigProvider:
+    """带 TTL 缓存和本地快照的配置读取
+
+    - 缓存未过期：直接返回内存中的配置
+    - 缓存已过期：先返回旧配置，同时在后台线程从 Airtable 刷新
+    - 进程刚启动：优先使用磁盘快照，后台刷新；没有快照时才同步请求 Airtable
+    - Airtable 超时或出错：继续使用最后一次成功的配置
+    """
+    def __init__(self, ttl=None, snapshot_path=None, timeout=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('CONFIG_TTL', '3600'))
+        self.snapshot_path = snapshot_path or os.getenv('CONFIG_SNAPSHOT_PATH', DEFAULT_CONFIG_SNAPSHOT_PATH)
+        self.timeout = timeout if timeout is not None else int(os.getenv('CONFIG_TIMEOUT', '10'))
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
 
-    logging.info("环境变量设置完成")
\ No newline at end of file
+    def get(self, force=False):
+        """返回配置字典，force=True 时同步刷新（失败时仍回退到旧配置）"""
+        if force:
+            self.refresh()
+        with self._lock:
+            values, loaded_at = self._values, self._loaded_at
+        if values is None:
+            values, loaded_at = self._load_snapshot()
+            if values is None:
+                # 没有任何可用配置，只能同步等待 Airtable
+                self.refresh(raise_on_error=True)
+                with self._lock:
+                    return dict(self._values)
+            with self._lock:
+                if self._values is None:
+                    self._values, self._loaded_at = values, loaded_at
+        if time.time() - loaded_at > self.ttl:
+            self.refresh_in_background()
+        with self._lock:
+            return dict(self._values)
+
+    def refresh(self, raise_on_error=False):
+        """从 Airtable 拉取配置并写入快照"""
+        try:
+            data = get_airtable_table(
+                'APIKeys', timeout=(self.timeout, self.timeout)
+            ).all(formula="{category} = 'deepsearch'")
+            values = records_to_env(data)
+        except Exception as e:
+            logging.error(f"从 Airtable 读取配置失败，继续使用上次的配置: {str(e)}")
+            if raise_on_error:
+                raise
+            return False
+        with self._lock:
+            self._values, self._loaded_at = values, time.time()
+        self._save_snapshot(values)
+        logging.info(f"已从 Airtable 刷新配置: {sorted(values)}")
+        return True
+
+    def refresh_in_background(self):
+        """在后台线程刷新配置，同一时间只有一个刷新任务"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='config-refresh', daemon=True).start()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            logging.info(f"使用本地配置快照: {self.snapshot_path}")
+            return snapshot['values'], snapshot['saved_at']
+        except FileNotFoundError:
+            return None, 0.0
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"读取本地配置快照失败: {str(e)}")
+            return None, 0.0
+
+    def _save_snapshot(self, values):
+        dirname = os.path.dirname(self.snapshot_path)
+        try:
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            tmp_path = f'{self.snapshot_path}.tmp'
+            # 快照里是密钥，只允许当前用户读写
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'values': values}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logging.warning(f"写入本地配置快照失败: {str(e)}")
+
+_config_provider = None
+
+def get_config_provider():
+    """进程内共享的 ConfigProvider，首次使用时创建（此时 .env 已加载）"""
+    global _config_provider
+    if _config_provider is None:
+        _config_provider = ConfigProvider()
+    return _config_provider
+
+def set_env_from_airtable_data(force=False):
+    """从 Airtable 数据设置环境变量（经 ConfigProvider 缓存，Airtable 不可用时回退到本地快照）"""
+    logging.info("开始设置环境变量")
+    values = get_config_provider().get(force=force)
+    os.environ.update(values)
+    logging.info(f"环境变量设置完成: {sorted(values)}")
@@ -0,0 +1,52 @@
+import re
+import sys
+import subprocess
+from typing import List, Tuple
+
+# python -X importtime 的输出格式: "import time:   self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$')
+
+def measure_import_times(module: str = 'app') -> List[Tuple[str, int, int]]:
+    """在新的解释器中用 -X importtime 导入 module，返回其直接依赖的 [(模块, 自身耗时us, 累计耗时us)]
+
+    第一项是 module 本身；子模块的耗时已计入其父模块的累计耗时。
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'导入 {module} 失败:\n{proc.stderr[-2000:]}')
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent)))
+
+    # importtime 先输出子模块再输出父模块：从 module 所在行往前找，直到上一个顶层导入
+    end = next((i for i, r in enumerate(rows) if r[0] == module and r[3] == 1), None)
+    if end is None:
+        return []
+    result = [rows[end][:3]]
+    for name, self_us, cumulative_us, indent in reversed(rows[:end]):
+        if indent <= 1:
+            break
+        if indent == 3:
+            result.append((name, self_us, cumulative_us))
+    return result
+
+def import_time_report(module: str = 'app', top: int = 20) -> str:
+    """生成启动耗时报告：总导入耗时和耗时最多的直接依赖"""
+    rows = measure_import_times(module)
+    if not rows:
+        return f'未找到 {module} 的导入记录'
+    total = rows[0][2]
+    ranked = sorted(rows[1:], key=lambda r: r[2], reverse=True)[:top]
+    lines = [f'import {module}: {total / 1000:.1f} ms', f"{'module':<40}{'cumulative(ms)':>16}{'self(ms)':>12}"]
+    for name, self_us, cumulative_us in ranked:
+        lines.append(f'{name:<40}{cumulative_us / 1000:>16.1f}{self_us / 1000:>12.1f}')
+    return '\n'.join(lines)
+
+__all__ = ['measure_import_times', 'import_time_report']